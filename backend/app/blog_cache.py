@@ -0,0 +1,105 @@
+"""
+Response cache for public blog listings
+
+Entries are keyed by the normalized query parameters of `get_blog_posts` and
+remember which filters produced them and which posts they contain. A write to
+a post only drops the entries that could show that post (before or after the
+change), so editors never see stale pages while unrelated pages stay warm.
+A comment write only drops the pages showing its post (comment_count).
+
+Listing totals are cached separately (keyed by the filter set only, so all
+pages and sort orders share one count) and invalidated the same way.
+
+The caches are per process - with several workers an entry on another worker
+can live up to BLOG_LIST_CACHE_TTL / COUNT_CACHE_TTL seconds, so keep them short.
+"""
+import os
+from typing import Iterable, Optional
+
+from .cache import TTLCache
+from .models import BlogPost
+
+BLOG_LIST_CACHE_TTL = float(os.getenv("BLOG_LIST_CACHE_TTL", "60"))
+BLOG_LIST_CACHE_SIZE = int(os.getenv("BLOG_LIST_CACHE_SIZE", "256"))
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "300"))
+COUNT_CACHE_SIZE = int(os.getenv("COUNT_CACHE_SIZE", "1024"))
+
+blog_list_cache = TTLCache(maxsize=BLOG_LIST_CACHE_SIZE, ttl=BLOG_LIST_CACHE_TTL)
+blog_count_cache = TTLCache(maxsize=COUNT_CACHE_SIZE, ttl=COUNT_CACHE_TTL)
+
+
+def parse_id_list(ids: Optional[str]) -> tuple:
+    """Parse comma-separated post IDs into a sorted tuple (invalid entries are skipped)"""
+    if not ids:
+        return ()
+    return tuple(sorted({int(id.strip()) for id in ids.split(",") if id.strip().isdecimal()}))
+
+
+def parse_tag_list(tags: Optional[str]) -> tuple:
+    """Parse comma-separated tags into a sorted tuple"""
+    if not tags:
+        return ()
+    return tuple(sorted({tag.strip() for tag in tags.split(',') if tag.strip()}))
+
+
+def listing_cache_key(**params) -> tuple:
+    """Build hashable cache key from normalized listing parameters"""
+    return tuple(sorted(params.items()))
+
+
+def cached_count(key: tuple, filters: dict, count_query) -> int:
+    """Listing total for a filter set - counted in SQL only on cache miss"""
+    total = blog_count_cache.get(key)
+    if total is None:
+        generation = blog_count_cache.generation
+        total = count_query()
+        blog_count_cache.set(key, total, meta={"filters": filters, "post_ids": set()}, generation=generation)
+    return total
+
+def post_scope(post: BlogPost) -> dict:
+    """Snapshot of the post attributes that decide which listings can contain it"""
+    return {
+        "id": post.id,
+        "is_published": bool(post.is_published),
+        "category": post.category,
+        "tags": {tag.tag_name for tag in post.tags},
+        "languages": {t.language_code for t in post.translations}
+    }
+
+
+def _listing_affected(filters: dict, post_ids: set, scope: dict) -> bool:
+    """Check if a cached listing could change because of the given post"""
+    if scope["id"] in post_ids:
+        return True
+    if filters["published_only"] and not scope["is_published"]:
+        return False
+    if filters["ids"] and scope["id"] not in filters["ids"]:
+        return False
+    if filters["category"] and scope["category"] != filters["category"]:
+        return False
+    if filters["tags"] and not scope["tags"].intersection(filters["tags"]):
+        return False
+    if filters["language"] and filters["language"] not in scope["languages"]:
+        return False
+    return True
+
+
+def invalidate_post(*scopes: Optional[dict]) -> int:
+    """Drop cached listings affected by a post write (pass scopes from before and after the write)"""
+    scopes: Iterable[dict] = [scope for scope in scopes if scope]
+    if not scopes:
+        return 0
+
+    def affected(key, meta) -> bool:
+        return meta is None or any(
+            _listing_affected(meta["filters"], meta["post_ids"], scope) for scope in scopes
+        )
+
+    return blog_list_cache.invalidate_where(affected) + blog_count_cache.invalidate_where(affected)
+
+
+def invalidate_post_listings(post_id: int) -> int:
+    """Drop cached listings showing the post (comment counters changed, membership and totals did not)"""
+    return blog_list_cache.invalidate_where(
+        lambda key, meta: meta is None or post_id in meta["post_ids"]
+    )
@@ -0,0 +1,101 @@
+"""
+In-process caches with LRU and TTL eviction
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after `ttl` seconds.
+
+    Every entry can carry metadata next to its value, so writers can invalidate
+    exactly the entries they affect (`invalidate_where`) instead of flushing
+    the whole cache. A cache with `maxsize <= 0` or `ttl <= 0` is disabled.
+
+    Every invalidation bumps `generation`. A reader that takes the generation
+    before loading a value and passes it to `set` skips storing the value when
+    a write invalidated the cache in the meantime, since it may have been read
+    before that write.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return cached value or `default` if missing/expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value, _meta = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, meta: Any = None, ttl: Optional[float] = None,
+            generation: Optional[int] = None) -> None:
+        """
+        Store value (with optional invalidation metadata), evicting least recently used entries
+        With `generation` (taken before the value was loaded) nothing is stored if an invalidation happened since.
+        """
+        if not self.enabled:
+            return
+
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (expires_at, value, meta)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Drop a single entry"""
+        with self._lock:
+            self.generation += 1
+            return self._data.pop(key, None) is not None
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Drop every entry for which predicate(key, meta) is true, returns number of dropped entries"""
+        with self._lock:
+            self.generation += 1
+            stale = [key for key, (_, _, meta) in self._data.items() if predicate(key, meta)]
+            for key in stale:
+                del self._data[key]
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses
+            }
@@ -0,0 +1,53 @@
+"""
+Caches for comment listings
+
+Totals: top-level comments of a post and replies to a comment are counted once
+per COUNT_CACHE_TTL and invalidated when a comment is added, instead of running
+COUNT(*) next to every page fetch.
+
+Thread pages: the viewer-independent part of a page of comments (content,
+replies, author role and rank, counters) is shared by all users and dropped on
+any comment or like write on the post. Viewer state (user_like_status,
+can_edit, can_delete) is overlaid per request. Author rank changes show up
+after COMMENT_THREAD_CACHE_TTL at the latest.
+
+Author metadata: roles and ranks, serialized for comment authors, are cached
+for AUTHOR_METADATA_CACHE_TTL so the comment write path doesn't load them.
+"""
+import os
+from typing import Callable, Optional
+
+from .blog_cache import COUNT_CACHE_SIZE, COUNT_CACHE_TTL
+from .cache import TTLCache
+
+COMMENT_THREAD_CACHE_TTL = float(os.getenv("COMMENT_THREAD_CACHE_TTL", "30"))
+COMMENT_THREAD_CACHE_SIZE = int(os.getenv("COMMENT_THREAD_CACHE_SIZE", "512"))
+AUTHOR_METADATA_CACHE_TTL = float(os.getenv("AUTHOR_METADATA_CACHE_TTL", "300"))
+
+comment_count_cache = TTLCache(maxsize=COUNT_CACHE_SIZE, ttl=COUNT_CACHE_TTL)
+comment_thread_cache = TTLCache(maxsize=COMMENT_THREAD_CACHE_SIZE, ttl=COMMENT_THREAD_CACHE_TTL)
+# Serialized roles and ranks used for comment authors (one entry)
+author_metadata_cache = TTLCache(maxsize=1, ttl=AUTHOR_METADATA_CACHE_TTL)
+
+
+def cached_comment_count(key: tuple, count_query: Callable[[], int]) -> int:
+    """Total for ("post", post_id) or ("replies", comment_id) - counted in SQL only on cache miss"""
+    total = comment_count_cache.get(key)
+    if total is None:
+        generation = comment_count_cache.generation
+        total = count_query()
+        comment_count_cache.set(key, total, generation=generation)
+    return total
+
+
+def invalidate_comment_counts(post_id: int, parent_id: Optional[int] = None) -> None:
+    """Drop the total that a new comment changes"""
+    if parent_id is None:
+        comment_count_cache.invalidate(("post", post_id))
+    else:
+        comment_count_cache.invalidate(("replies", parent_id))
+
+
+def invalidate_comment_thread(post_id: int) -> int:
+    """Drop all cached thread pages of a post (keys are ("thread", post_id, ...))"""
+    return comment_thread_cache.invalidate_where(lambda key, meta: key[1] == post_id)
@@ -0,0 +1,72 @@
+"""
+Per-post comment counters (blog_post_comment_stats)
+
+The comments router adjusts the counters in the same transaction as the comment
+write, readers fetch them for many posts with one primary-key lookup. Posts
+without a row have no comments. `python app/data_migrations.py post-comment-stats` repairs
+drift.
+"""
+from typing import Dict, Iterable
+
+from sqlalchemy import case, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .models import BlogPostCommentStats, Comment
+
+
+def count_post_comments(db: Session, post_id: int) -> tuple:
+    """(comment_count, reply_count) of a post counted from the comments table"""
+    comments, replies = db.query(
+        func.count(Comment.id),
+        func.coalesce(func.sum(case((Comment.parent_id.isnot(None), 1), else_=0)), 0)
+    ).filter(
+        Comment.post_id == post_id,
+        Comment.is_deleted == False
+    ).one()
+    return comments, replies
+
+
+def adjust_post_comment_stats(db: Session, post_id: int, comments: int, replies: int = 0) -> None:
+    """
+    Apply a counter delta for a comment write (call before commit)
+    A missing row is created from a full count, which already includes the flushed write.
+    """
+    updated = db.query(BlogPostCommentStats).filter(BlogPostCommentStats.post_id == post_id).update({
+        BlogPostCommentStats.comment_count: BlogPostCommentStats.comment_count + comments,
+        BlogPostCommentStats.reply_count: BlogPostCommentStats.reply_count + replies
+    }, synchronize_session=False)
+    if updated:
+        return
+
+    db.flush()
+    comment_count, reply_count = count_post_comments(db, post_id)
+    try:
+        with db.begin_nested():
+            db.add(BlogPostCommentStats(post_id=post_id, comment_count=comment_count, reply_count=reply_count))
+    except IntegrityError:
+        # Created by a concurrent write in the meantime - apply the delta to it
+        adjust_post_comment_stats(db, post_id, comments, replies)
+
+
+def load_comment_stats(db: Session, post_ids: Iterable[int]) -> Dict[int, tuple]:
+    """{post_id: (comment_count, reply_count)} for the given posts in one query (posts without comments omitted)"""
+    post_ids = set(post_ids)
+    if not post_ids:
+        return {}
+    return {
+        post_id: (comment_count, reply_count)
+        for post_id, comment_count, reply_count in db.query(
+            BlogPostCommentStats.post_id, BlogPostCommentStats.comment_count, BlogPostCommentStats.reply_count
+        ).filter(BlogPostCommentStats.post_id.in_(post_ids))
+    }
+
+
+def comment_stats_response(post_id: int, comment_count: int, reply_count: int) -> dict:
+    """Stats as returned by the comment stats endpoints"""
+    return {
+        "post_id": post_id,
+        "total_comments": comment_count,
+        "total_replies": reply_count,
+        "total_interactions": comment_count
+    }
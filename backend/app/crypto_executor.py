@@ -0,0 +1,109 @@
+"""
+Bounded executor for CPU-bound crypto (bcrypt password hashing and verification)
+
+bcrypt with 12 rounds takes hundreds of milliseconds. Run inline in an async
+endpoint it blocks the event loop and every concurrent request with it. Jobs
+run here on PASSWORD_HASH_WORKERS threads instead (bcrypt releases the GIL).
+At most PASSWORD_HASH_QUEUE jobs may wait for a free thread; beyond that new
+jobs are rejected right away (CryptoExecutorBusy -> 503), so a login spike
+cannot build an unbounded backlog.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "64"))
+
+
+class CryptoExecutorBusy(Exception):
+    """All workers are busy and the wait queue is full"""
+
+
+class BoundedCryptoExecutor:
+    """Thread pool with a queue-depth limit and counters for monitoring"""
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, queue_size: int = PASSWORD_HASH_QUEUE,
+                 name: str = "crypto"):
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self.pending = 0  # Submitted and not finished (running + queued)
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.peak_pending = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    async def run(self, fn: Callable, *args):
+        """Run fn(*args) on a worker thread and await the result (raises CryptoExecutorBusy when saturated)"""
+        with self._lock:
+            if self.pending >= self.workers + self.queue_size:
+                self.rejected += 1
+                raise CryptoExecutorBusy()
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            with self._lock:
+                self.running += 1
+                self.wait_seconds += started - submitted
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.run_seconds += time.perf_counter() - started
+
+        def release(future: Future) -> None:
+            # Runs when the job finishes, also after the awaiting request was cancelled
+            # (a job already on a thread keeps it busy until bcrypt returns)
+            with self._lock:
+                self.pending -= 1
+                if future.cancelled():
+                    return
+                if future.exception() is None:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+        try:
+            future = self._executor.submit(job)
+        except RuntimeError:
+            # Executor already shut down
+            with self._lock:
+                self.pending -= 1
+            raise
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "running": self.running,
+                "queued": self.pending - self.running,
+                "peak_pending": self.peak_pending,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.wait_seconds / finished * 1000, 2) if finished else 0.0,
+                "avg_run_ms": round(self.run_seconds / finished * 1000, 2) if finished else 0.0
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+password_executor = BoundedCryptoExecutor(name="password-hash")
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Jednorazowe migracje danych po zmianach schematu
+Uruchom jako: python app/data_migrations.py [nazwa ...]   (bez nazw - wszystkie po kolei)
+
+Migracje są idempotentne, ale nie należą do cyklicznych zadań (tasks.py):
+przeliczają dużą część tabel i powinny przebiec raz, po wdrożeniu, poza
+procesem API. Cache list bloga w działających workerach wygasają po
+BLOG_LIST_CACHE_TTL / COUNT_CACHE_TTL sekundach.
+"""
+
+import argparse
+import os
+import sys
+
+# Add the app directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import bindparam, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased, selectinload
+
+from app.blog_cache import invalidate_post, post_scope
+from app.comment_stats import count_post_comments
+from app.database import SessionLocal
+from app.models import BlogPost, BlogPostCommentStats, BlogPostDocument, BlogPostTranslation, BlogTag, Comment, CommentLike, blog_post_tags, comment_hot_score, estimate_reading_time
+from app.post_documents import render_post_documents
+from app.search import build_search_vector, is_postgres
+from app.tag_utils import get_or_create_tags, refresh_tag_counts
+
+
+def backfill_reading_times(db: Session, batch_size: int = 500) -> int:
+    """
+    Fill reading_time of translations written before it was precomputed
+    updated_at stays as it was (not an edit); documents of touched posts are re-rendered.
+    """
+    translations = BlogPostTranslation.__table__
+    statement = update(translations).where(
+        translations.c.id == bindparam("translation_id"),
+        translations.c.reading_time.is_(None)  # Set by a content edit in the meantime
+    ).values(
+        reading_time=bindparam("new_reading_time"),
+        updated_at=translations.c.updated_at  # Not an edit
+    )
+
+    updated = 0
+    last_id = 0
+    while True:
+        rows = db.query(BlogPostTranslation.id, BlogPostTranslation.post_id, BlogPostTranslation.content).filter(
+            BlogPostTranslation.id > last_id,
+            BlogPostTranslation.reading_time.is_(None)
+        ).order_by(BlogPostTranslation.id).limit(batch_size).all()
+        if not rows:
+            return updated
+        last_id = rows[-1].id
+
+        db.execute(statement, [
+            {"translation_id": translation_id, "new_reading_time": estimate_reading_time(content)}
+            for translation_id, _, content in rows
+        ])
+        for post_id in {post_id for _, post_id, _ in rows}:
+            render_post_documents(db, post_id)
+        db.commit()
+        db.expunge_all()
+        updated += len(rows)
+
+
+def build_search_vectors(db: Session, batch_size: int = 100) -> int:
+    """Build search_vector of translations written before search was enabled (PostgreSQL only, updated_at stays as it was)"""
+    if not is_postgres(db):
+        return 0
+
+    updated = 0
+    last_id = 0
+    while True:
+        rows = db.query(
+            BlogPostTranslation.id, BlogPostTranslation.language_code,
+            BlogPostTranslation.title, BlogPostTranslation.excerpt, BlogPostTranslation.content
+        ).filter(
+            BlogPostTranslation.id > last_id,
+            BlogPostTranslation.search_vector.is_(None)
+        ).order_by(BlogPostTranslation.id).limit(batch_size).all()
+        if not rows:
+            return updated
+        last_id = rows[-1].id
+
+        for translation_id, language_code, title, excerpt, content in rows:
+            db.execute(
+                update(BlogPostTranslation).where(
+                    BlogPostTranslation.id == translation_id,
+                    BlogPostTranslation.search_vector.is_(None)  # Rebuilt by an edit in the meantime
+                ).values(
+                    search_vector=build_search_vector(language_code, title, excerpt, content),
+                    updated_at=BlogPostTranslation.updated_at  # Not an edit
+                ).execution_options(synchronize_session=False)
+            )
+        db.commit()
+        updated += len(rows)
+
+
+def migrate_legacy_tags(db: Session) -> int:
+    """
+    Move legacy blog_tags rows into normalized tags / blog_post_tags and delete them
+    Touched posts get their documents re-rendered and cached listings dropped.
+    """
+    legacy = db.query(BlogTag.post_id, BlogTag.tag_name).filter(
+        BlogTag.post_id.isnot(None)
+    ).distinct().all()
+    post_ids = {post_id for post_id, _ in legacy}
+
+    scopes_before = {
+        post.id: post_scope(post)
+        for post in db.query(BlogPost).options(
+            selectinload(BlogPost.tags), selectinload(BlogPost.translations)
+        ).filter(BlogPost.id.in_(post_ids))
+    }
+
+    rows = []
+    if legacy:
+        tags = {tag.tag_name: tag.id for tag in get_or_create_tags(db, [name for _, name in legacy])}
+        existing = set(db.query(blog_post_tags.c.post_id, blog_post_tags.c.tag_id).filter(
+            blog_post_tags.c.post_id.in_(post_ids)
+        ))
+        for post_id, tag_name in legacy:
+            tag_id = tags.get(tag_name.strip())
+            if tag_id is not None and post_id in scopes_before and (post_id, tag_id) not in existing:
+                existing.add((post_id, tag_id))
+                rows.append({"post_id": post_id, "tag_id": tag_id})
+        if rows:
+            db.execute(blog_post_tags.insert(), rows)
+
+    # Copied rows (and orphans without a post) are not needed any more - the migration cannot run twice
+    db.query(BlogTag).delete(synchronize_session=False)
+    # Also repairs any drift of the maintained counters
+    refresh_tag_counts(db)
+    for post_id in scopes_before:
+        render_post_documents(db, post_id)
+    db.commit()
+
+    for post_id, scope_before in scopes_before.items():
+        post = db.get(BlogPost, post_id)
+        invalidate_post(scope_before, post_scope(post) if post else None)
+    return len(rows)
+
+
+def render_missing_post_documents(db: Session, batch_size: int = 100) -> int:
+    """
+    Render documents of translations that have none (posts written before documents existed)
+    Until then listings and post reads render them in memory on every request.
+    """
+    post_ids = [post_id for (post_id,) in db.query(BlogPostTranslation.post_id).outerjoin(
+        BlogPostDocument,
+        (BlogPostDocument.post_id == BlogPostTranslation.post_id) &
+        (BlogPostDocument.language_code == BlogPostTranslation.language_code)
+    ).filter(BlogPostDocument.id.is_(None)).distinct()]
+
+    for start in range(0, len(post_ids), batch_size):
+        for post_id in post_ids[start:start + batch_size]:
+            render_post_documents(db, post_id)
+        db.commit()
+        db.expunge_all()
+    return len(post_ids)
+
+
+def locked_batches(db: Session, column, batch_size: int):
+    """
+    Yield ids of `column`'s table in batches whose rows stay locked (FOR UPDATE) until the caller commits
+    Writers touching a locked row wait, so a batch recomputed from a fresh snapshot cannot lose their increments.
+    """
+    last_id = 0
+    while True:
+        ids = [id for (id,) in db.query(column).filter(column > last_id).order_by(column).limit(batch_size).with_for_update()]
+        if not ids:
+            return
+        last_id = ids[-1]
+        yield ids
+
+
+def backfill_comment_counters(db: Session, batch_size: int = 500) -> int:
+    """Recompute drifted likes_count / dislikes_count / replies_count / score (comments written before the counters existed)"""
+    def like_count(is_like: bool):
+        return select(func.count(CommentLike.id)).where(
+            CommentLike.comment_id == Comment.id,
+            CommentLike.is_like == is_like
+        ).scalar_subquery()
+
+    reply = aliased(Comment)
+    replies = select(func.count(reply.id)).where(
+        reply.parent_id == Comment.id,
+        reply.is_deleted == False
+    ).scalar_subquery()
+
+    updated = 0
+    for ids in locked_batches(db, Comment.id, batch_size):
+        updated += db.execute(
+            update(Comment).where(Comment.id.in_(ids), or_(
+                Comment.likes_count != like_count(True),
+                Comment.dislikes_count != like_count(False),
+                Comment.replies_count != replies,
+                Comment.score != Comment.likes_count - Comment.dislikes_count
+            )).values(
+                likes_count=like_count(True),
+                dislikes_count=like_count(False),
+                replies_count=replies,
+                score=like_count(True) - like_count(False),
+                updated_at=Comment.updated_at  # Not an edit
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+    return updated
+
+
+def backfill_comment_hot_scores(db: Session, batch_size: int = 500) -> int:
+    """Recompute hot_score of all comments from their score (comments written before hot_score existed)"""
+    comments = Comment.__table__
+    statement = update(comments).where(comments.c.id == bindparam("comment_id")).values(
+        hot_score=bindparam("new_hot_score"),
+        updated_at=comments.c.updated_at  # Not an edit
+    )
+
+    updated = 0
+    for ids in locked_batches(db, Comment.id, batch_size):
+        rows = [
+            {"comment_id": comment_id, "new_hot_score": comment_hot_score(score, created_at)}
+            for comment_id, score, created_at, hot_score in db.query(
+                Comment.id, Comment.score, Comment.created_at, Comment.hot_score
+            ).filter(Comment.id.in_(ids))
+            if hot_score != comment_hot_score(score, created_at)
+        ]
+        if rows:
+            db.execute(statement, rows)
+        db.commit()
+        updated += len(rows)
+    return updated
+
+
+def backfill_post_comment_stats(db: Session, batch_size: int = 500) -> int:
+    """Create missing blog_post_comment_stats rows and recompute drifted ones (posts commented before the counters existed)"""
+    changed = 0
+    missing = db.query(Comment.post_id).filter(
+        ~select(BlogPostCommentStats.post_id).where(BlogPostCommentStats.post_id == Comment.post_id).exists()
+    ).distinct().all()
+    for (post_id,) in missing:
+        comment_count, reply_count = count_post_comments(db, post_id)
+        try:
+            with db.begin_nested():
+                db.add(BlogPostCommentStats(post_id=post_id, comment_count=comment_count, reply_count=reply_count))
+            changed += 1
+        except IntegrityError:
+            pass  # Created from a full count by a comment write in the meantime
+        db.commit()
+
+    def comment_count(replies_only: bool):
+        query = select(func.count(Comment.id)).where(
+            Comment.post_id == BlogPostCommentStats.post_id,
+            Comment.is_deleted == False
+        )
+        if replies_only:
+            query = query.where(Comment.parent_id.isnot(None))
+        return query.scalar_subquery()
+
+    for post_ids in locked_batches(db, BlogPostCommentStats.post_id, batch_size):
+        changed += db.execute(
+            update(BlogPostCommentStats).where(BlogPostCommentStats.post_id.in_(post_ids), or_(
+                BlogPostCommentStats.comment_count != comment_count(False),
+                BlogPostCommentStats.reply_count != comment_count(True)
+            )).values(
+                comment_count=comment_count(False),
+                reply_count=comment_count(True)
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+    return changed
+
+
+MIGRATIONS = {
+    "reading-times": (backfill_reading_times, "tłumaczenia z uzupełnionym czasem czytania"),
+    "search-vectors": (build_search_vectors, "tłumaczenia z indeksem wyszukiwania"),
+    "legacy-tags": (migrate_legacy_tags, "przeniesione przypisania tagów"),
+    "post-documents": (render_missing_post_documents, "posty z nowymi dokumentami"),
+    "comment-counters": (backfill_comment_counters, "komentarze z poprawionymi licznikami"),
+    "comment-hot-scores": (backfill_comment_hot_scores, "komentarze z przeliczonym hot_score"),
+    "post-comment-stats": (backfill_post_comment_stats, "posty z poprawionymi statystykami komentarzy"),
+}
+
+
+def run_migrations(names) -> None:
+    for name in names:
+        migration, label = MIGRATIONS[name]
+        db = SessionLocal()
+        try:
+            print(f"▶️  {name}: {label}: {migration(db)}")
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Jednorazowe migracje danych")
+    parser.add_argument("names", nargs="*", help=f"Migracje do uruchomienia: {', '.join(MIGRATIONS)} (domyślnie wszystkie)")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in MIGRATIONS]
+    if unknown:
+        parser.error(f"nieznane migracje: {', '.join(unknown)}")
+
+    print("🚀 Portfolio Backend - Migracje danych")
+    print("=" * 50)
+    run_migrations(args.names or list(MIGRATIONS))
+    print("✅ Migracje zakończone")
+
+
+if __name__ == "__main__":
+    main()
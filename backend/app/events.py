@@ -0,0 +1,142 @@
+"""
+In-process pub/sub for live comment events (Server-Sent Events)
+
+Write endpoints publish events per post; every open stream of that post gets
+them through its own bounded queue. The last COMMENT_STREAM_BUFFER events of a
+post are kept in a ring buffer, so a reconnecting client sending Last-Event-ID
+receives what it missed. A consumer whose queue fills up is disconnected (and
+resumes from the ring buffer on reconnect) instead of slowing down writers.
+
+Events are per process - with several workers a client only sees writes made
+by the worker serving its stream. Publish from the event loop (async endpoints).
+"""
+import asyncio
+import json
+import os
+import uuid
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+COMMENT_STREAM_BUFFER = int(os.getenv("COMMENT_STREAM_BUFFER", "100"))
+COMMENT_STREAM_QUEUE_SIZE = int(os.getenv("COMMENT_STREAM_QUEUE_SIZE", "100"))
+COMMENT_STREAM_HEARTBEAT = float(os.getenv("COMMENT_STREAM_HEARTBEAT", "15"))
+COMMENT_STREAM_MAX_SUBSCRIBERS = int(os.getenv("COMMENT_STREAM_MAX_SUBSCRIBERS", "1000"))
+COMMENT_STREAM_MAX_POSTS = 1000  # Ring buffers kept for posts without open streams
+
+# Event ids are "<boot>:<sequence>" - ids from before a restart trigger a reset
+BOOT_ID = uuid.uuid4().hex[:8]
+
+# Sentinel put into a queue to close an overflowed subscription
+CLOSED = None
+
+Event = Tuple[str, str, str]  # (id, type, JSON data)
+
+
+def format_event(event: Event) -> str:
+    """SSE wire format of an event"""
+    event_id, event_type, data = event
+    return f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n"
+
+
+class Subscription:
+    """Open stream of one client"""
+
+    def __init__(self, post_id: int, queue_size: int):
+        self.post_id = post_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+
+class CommentEventBroker:
+    """Per-post fan-out with replay buffer and bounded subscriber queues"""
+
+    def __init__(self, buffer_size: int = COMMENT_STREAM_BUFFER, queue_size: int = COMMENT_STREAM_QUEUE_SIZE,
+                 max_subscribers: int = COMMENT_STREAM_MAX_SUBSCRIBERS, max_posts: int = COMMENT_STREAM_MAX_POSTS):
+        self.buffer_size = buffer_size
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.max_posts = max_posts
+        self._sequences: Dict[int, int] = {}
+        self._buffers: "OrderedDict[int, Deque[Tuple[int, Event]]]" = OrderedDict()
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self.dropped = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    @property
+    def is_full(self) -> bool:
+        return self.subscriber_count >= self.max_subscribers
+
+    def publish(self, post_id: int, event_type: str, data: dict) -> None:
+        """Record an event and push it to all open streams of the post"""
+        sequence = self._sequences.get(post_id, 0) + 1
+        self._sequences[post_id] = sequence
+        event = (f"{BOOT_ID}:{sequence}", event_type, json.dumps(jsonable_encoder(data), separators=(",", ":")))
+
+        buffer = self._buffers.get(post_id)
+        if buffer is None:
+            buffer = self._buffers[post_id] = deque(maxlen=self.buffer_size)
+        self._buffers.move_to_end(post_id)
+        buffer.append((sequence, event))
+        self._evict_idle_buffers()
+
+        for subscription in list(self._subscribers.get(post_id, ())):
+            self._deliver(subscription, event)
+
+    def _deliver(self, subscription: Subscription, event: Event) -> None:
+        if subscription.overflowed:
+            return
+        try:
+            subscription.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow consumer - close its stream, it resumes from the ring buffer on reconnect
+            subscription.overflowed = True
+            self.dropped += 1
+            subscription.queue.get_nowait()
+            subscription.queue.put_nowait(CLOSED)
+
+    def _evict_idle_buffers(self) -> None:
+        while len(self._buffers) > self.max_posts:
+            idle = next((post_id for post_id in self._buffers if not self._subscribers.get(post_id)), None)
+            if idle is None:
+                return
+            del self._buffers[idle]
+            self._sequences.pop(idle, None)
+
+    def replay(self, post_id: int, last_event_id: Optional[str]) -> Optional[List[Event]]:
+        """Events after `last_event_id`, or None when they are no longer buffered (client must refetch)"""
+        if not last_event_id:
+            return []
+        boot, _, sequence = last_event_id.partition(":")
+        if boot != BOOT_ID or not sequence.isdecimal():
+            return None
+
+        sequence = int(sequence)
+        buffer = self._buffers.get(post_id, ())
+        if sequence > self._sequences.get(post_id, 0):
+            return None
+        if sequence < self._sequences.get(post_id, 0) and (not buffer or buffer[0][0] > sequence + 1):
+            return None
+        return [event for event_sequence, event in buffer if event_sequence > sequence]
+
+    def subscribe(self, post_id: int) -> Optional[Subscription]:
+        """Open a stream (None when the subscriber limit is reached)"""
+        if self.is_full:
+            return None
+        subscription = Subscription(post_id, self.queue_size)
+        self._subscribers.setdefault(post_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.post_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.post_id]
+
+
+comment_events = CommentEventBroker()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Eksport opublikowanych postów do statycznych plików JSON (pod CDN)
+Uruchom jako: python app/export_static.py --output ./static-export [--incremental]
+
+Struktura katalogu:
+    posts/{language}/{slug}.json     - pełny post w jednym języku (jak GET /api/blog/{slug}?language=)
+    lists/{language}/page-{n}.json   - strony listy (jak GET /api/blog/?language=&page=n)
+    manifest.json                    - wersje plików, używane przez tryb przyrostowy
+
+Posty są czytane strumieniowo (yield_per), więc zużycie pamięci nie zależy od
+liczby postów. Tryb --incremental zapisuje tylko pliki, których treść się zmieniła.
+W obu trybach pliki z poprzedniego manifest.json, których już nie ma (usunięte lub
+ukryte posty, strony poza nową liczbą stron), są usuwane. Posty bez zapisanego
+dokumentu są renderowane w pamięci - eksport niczego nie zapisuje w bazie.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from itertools import islice
+
+# Add the app directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+
+from app.database import SessionLocal
+from app.models import BlogPost, BlogPostDocument, BlogPostTranslation
+from app.post_documents import missing_documents, paginated_json
+
+MANIFEST_NAME = "manifest.json"
+DEFAULT_OUTPUT = os.getenv("STATIC_EXPORT_DIR", "static-export")
+
+
+def write_file(output: str, path: str, body: bytes) -> None:
+    """Atomically write a file relative to the output directory"""
+    target = os.path.join(output, path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = f"{target}.tmp"
+    with open(tmp, "wb") as file:
+        file.write(body)
+    os.replace(tmp, target)
+
+
+def remove_file(output: str, path: str) -> None:
+    try:
+        os.remove(os.path.join(output, path))
+    except FileNotFoundError:
+        pass
+
+
+def load_manifest(output: str) -> dict:
+    try:
+        with open(os.path.join(output, MANIFEST_NAME), encoding="utf-8") as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def digest(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+def render_missing(db, keys) -> dict:
+    """{(post_id, language): document_fields} rendered in memory for (post_id, language) pairs without a document"""
+    rendered = {}
+    for language in {language for _, language in keys}:
+        documents = missing_documents(db, [post_id for post_id, key_language in keys if key_language == language], language)
+        rendered.update({(post_id, language): fields for post_id, fields in documents.items()})
+    return rendered
+
+
+def published_documents(db, *columns, batch_size: int):
+    """
+    Stream (language, post_id, *columns) of published translations - per language, newest first (same order as the API)
+    BlogPostDocument columns of translations without a stored document come from an in-memory rendering.
+    """
+    rows = iter(db.query(BlogPostTranslation.language_code, BlogPost.id, BlogPostDocument.id, *columns).join(
+        BlogPost, BlogPost.id == BlogPostTranslation.post_id
+    ).outerjoin(
+        BlogPostDocument,
+        (BlogPostDocument.post_id == BlogPostTranslation.post_id) &
+        (BlogPostDocument.language_code == BlogPostTranslation.language_code)
+    ).filter(
+        BlogPost.is_published == True
+    ).order_by(
+        BlogPostTranslation.language_code,
+        BlogPost.published_at.desc().nullslast(),
+        BlogPost.id.desc()
+    ).yield_per(batch_size))
+
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        rendered = render_missing(db, [(post_id, language) for language, post_id, document_id, *_ in batch if document_id is None])
+        for language, post_id, document_id, *values in batch:
+            if document_id is None:
+                fields = rendered[(post_id, language)]
+                values = [fields[column.key] if column.class_ is BlogPostDocument else value
+                          for column, value in zip(columns, values)]
+            yield (language, post_id, *values)
+
+
+def export_posts(db, output: str, previous: dict, incremental: bool, batch_size: int) -> tuple:
+    """Write per-slug documents and remove files of the previous export that are gone, returns (posts manifest, written, removed)"""
+    posts = {}
+    changed = []
+    for language, post_id, slug, version in published_documents(
+        db, BlogPost.slug, BlogPostDocument.version, batch_size=batch_size
+    ):
+        path = f"posts/{language}/{slug}.json"
+        posts[path] = {"id": post_id, "version": version}
+        if not incremental or previous.get(path, {}).get("version") != version:
+            changed.append((post_id, language, path))
+
+    # Bodies are fetched only for changed documents, one batch at a time
+    for start in range(0, len(changed), batch_size):
+        batch = changed[start:start + batch_size]
+        bodies = {
+            (post_id, language): body
+            for post_id, language, body in db.query(
+                BlogPostDocument.post_id, BlogPostDocument.language_code, BlogPostDocument.full
+            ).filter(BlogPostDocument.post_id.in_({post_id for post_id, _, _ in batch}))
+        }
+        missing = [(post_id, language) for post_id, language, _ in batch if (post_id, language) not in bodies]
+        bodies.update({key: fields["full"] for key, fields in render_missing(db, missing).items()})
+        for post_id, language, path in batch:
+            write_file(output, path, bodies[(post_id, language)].encode())
+
+    removed = [path for path in previous if path not in posts]
+    for path in removed:
+        remove_file(output, path)
+
+    return posts, len(changed), len(removed)
+
+
+def export_lists(db, output: str, previous: dict, incremental: bool, per_page: int, batch_size: int) -> tuple:
+    """Write list pages per language and remove pages of the previous export that are gone, returns (lists manifest, languages summary, written, removed)"""
+    totals = dict(db.query(BlogPostTranslation.language_code, func.count()).join(
+        BlogPost, BlogPost.id == BlogPostTranslation.post_id
+    ).filter(BlogPost.is_published == True).group_by(BlogPostTranslation.language_code))
+    languages = {
+        language: {"total": total, "pages": (total + per_page - 1) // per_page}
+        for language, total in totals.items()
+    }
+
+    lists = {}
+    written = 0
+
+    def flush(language: str, page: int, items: list) -> None:
+        nonlocal written
+        path = f"lists/{language}/page-{page}.json"
+        body = paginated_json(
+            items, total=totals[language], page=page, pages=languages[language]["pages"],
+            per_page=per_page, next_cursor=None
+        )
+        lists[path] = digest(body)
+        if not incremental or previous.get(path) != lists[path]:
+            write_file(output, path, body)
+            written += 1
+
+    current_language, page, items = None, 0, []
+    for language, _, summary in published_documents(db, BlogPostDocument.summary, batch_size=batch_size):
+        if language != current_language:
+            if items:
+                flush(current_language, page, items)
+            current_language, page, items = language, 1, []
+        elif len(items) == per_page:
+            flush(current_language, page, items)
+            page, items = page + 1, []
+        items.append(summary)
+    if items:
+        flush(current_language, page, items)
+
+    removed = [path for path in previous if path not in lists]
+    for path in removed:
+        remove_file(output, path)
+
+    return lists, languages, written, len(removed)
+
+
+def export_static(output: str, incremental: bool = False, per_page: int = 10, batch_size: int = 200) -> dict:
+    """
+    Export published posts to `output`, returns the written manifest
+    The previous manifest always drives cleanup, `incremental` only skips rewriting unchanged files.
+    """
+    previous = load_manifest(output)
+    # A changed page layout cannot reuse list pages (old ones past the new page count are still removed)
+    reuse_lists = incremental and previous.get("per_page") == per_page
+
+    db = SessionLocal()
+    try:
+        posts, posts_written, posts_removed = export_posts(
+            db, output, previous.get("posts", {}), incremental, batch_size
+        )
+        lists, languages, lists_written, lists_removed = export_lists(
+            db, output, previous.get("lists", {}), reuse_lists, per_page, batch_size
+        )
+    finally:
+        db.close()
+
+    manifest = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "per_page": per_page,
+        "languages": languages,
+        "lists": lists,
+        "posts": posts
+    }
+    write_file(output, MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=1).encode())
+
+    print(f"📄 Posty: zapisano {posts_written}, usunięto {posts_removed}, razem {len(posts)}")
+    print(f"📚 Listy: zapisano {lists_written}, usunięto {lists_removed}, razem {len(lists)}")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Eksport opublikowanych postów do statycznych plików JSON")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Katalog docelowy (STATIC_EXPORT_DIR)")
+    parser.add_argument("--incremental", action="store_true", help="Zapisz tylko zmienione pliki (wg manifest.json)")
+    parser.add_argument("--per-page", type=int, default=10, help="Liczba postów na stronie listy")
+    parser.add_argument("--batch-size", type=int, default=200, help="Liczba wierszy pobieranych naraz z bazy")
+    args = parser.parse_args()
+
+    print("🚀 Portfolio Backend - Eksport statyczny bloga")
+    print("=" * 50)
+    export_static(args.output, args.incremental, args.per_page, args.batch_size)
+    print(f"✅ Eksport zakończony: {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
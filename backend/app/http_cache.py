@@ -0,0 +1,64 @@
+"""
+HTTP conditional GET helpers (ETag / Last-Modified / 304 Not Modified)
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+from .datetime_utils import make_timezone_aware
+
+# Clients and CDNs may store responses but must revalidate them on every use
+CACHE_CONTROL = "no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag derived from a version tuple"""
+    digest = hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def latest(*timestamps: Optional[datetime]) -> Optional[datetime]:
+    """Most recent timestamp (timezone-aware UTC), ignoring missing ones"""
+    values = [make_timezone_aware(ts) for ts in timestamps if ts is not None]
+    return max(values) if values else None
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """Check If-None-Match (preferred) or If-Modified-Since against current version"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # HTTP dates have second precision (stored timestamps come back naive UTC)
+        return make_timezone_aware(last_modified).replace(microsecond=0) <= since
+
+    return False
+
+
+def set_cache_headers(response: Response, etag: str, last_modified: Optional[datetime] = None) -> None:
+    """Attach validators to a response"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    if last_modified is not None:
+        response.headers["Last-Modified"] = format_datetime(
+            make_timezone_aware(last_modified).astimezone(timezone.utc), usegmt=True
+        )
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    """Empty 304 response carrying the current validators"""
+    response = Response(status_code=304)
+    set_cache_headers(response, etag, last_modified)
+    return response
@@ -0,0 +1,73 @@
+"""
+Cache of authenticated callers
+
+Access tokens carry the user's email (or legacy username) as subject. Resolving
+it costs a user lookup plus lazy role and rank loads on every request, so the
+result is kept as a read-only UserSnapshot keyed by the subject for
+IDENTITY_CACHE_TTL seconds. Endpoints that change the cached columns (profile,
+role / rank assignment, rank upgrades, account deletion) call
+invalidate_identity. The cache is per process - on other workers a change shows
+up after IDENTITY_CACHE_TTL at the latest.
+"""
+import os
+from typing import Optional
+
+from .cache import TTLCache
+from .models import User
+
+IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", "60"))
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "4096"))
+
+identity_cache = TTLCache(maxsize=IDENTITY_CACHE_SIZE, ttl=IDENTITY_CACHE_TTL)
+
+
+class Snapshot:
+    """Read-only copy of the FIELDS of an ORM object (safe to share between requests)"""
+    FIELDS: tuple = ()
+
+    def __init__(self, source):
+        for field in self.FIELDS:
+            object.__setattr__(self, field, getattr(source, field))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+
+class RoleSnapshot(Snapshot):
+    FIELDS = ("id", "name", "display_name", "color", "level", "permissions")
+
+
+class RankSnapshot(Snapshot):
+    FIELDS = ("id", "name", "display_name", "color", "level", "icon")
+
+
+class UserSnapshot(Snapshot):
+    """Caller identity for read endpoints - account state, role and rank (not attached to a session)"""
+    FIELDS = ("id", "username", "email", "full_name", "is_active", "email_verified", "role_id", "rank_id")
+
+    def __init__(self, user: User):
+        super().__init__(user)
+        object.__setattr__(self, "role", RoleSnapshot(user.role) if user.role else None)
+        object.__setattr__(self, "rank", RankSnapshot(user.rank) if user.rank else None)
+
+
+def identity_generation() -> int:
+    """Take before resolving a subject and pass to cache_identity (skips caching users changed meanwhile)"""
+    return identity_cache.generation
+
+
+def cache_identity(subject: str, user: User, generation: Optional[int] = None) -> UserSnapshot:
+    """Snapshot the user resolved for a token subject and remember it"""
+    snapshot = UserSnapshot(user)
+    identity_cache.set(subject, snapshot, meta=user.id, generation=generation)
+    return snapshot
+
+
+def cached_identity(subject: str) -> Optional[UserSnapshot]:
+    return identity_cache.get(subject)
+
+
+def invalidate_identity(*user_ids: int) -> int:
+    """Drop cached identities of the given users (call after commit of a change to them)"""
+    user_ids = set(user_ids)
+    return identity_cache.invalidate_where(lambda key, meta: meta in user_ids)
@@ -13,6 +13,9 @@ from .security import limiter, get_current_admin_user, conditional_limit
 from .schemas import ContactForm, ContactResponse
 from .email_service import EmailService
 from .tasks import run_maintenance_tasks
+from .rank_utils import user_stats_buffer, USER_STATS_FLUSH_INTERVAL
+from .crypto_executor import password_executor
+from .rate_limiting import RATE_LIMIT_SYNC_INTERVAL
 import uvicorn
 import resend
 
@@ -46,6 +49,26 @@ async def periodic_cleanup():
         # Wait 1 hour before next cleanup
         await asyncio.sleep(3600)
 
+async def periodic_stats_flush():
+    """Flush buffered user stats and rank upgrades every few seconds"""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(USER_STATS_FLUSH_INTERVAL)
+        try:
+            await loop.run_in_executor(None, user_stats_buffer.flush)
+        except Exception as e:
+            print(f"Error in user stats flush: {e}")
+
+async def periodic_rate_limit_flush():
+    """Push rate-limit hits admitted on the local fast path to the shared storage"""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(RATE_LIMIT_SYNC_INTERVAL)
+        try:
+            await loop.run_in_executor(None, limiter.flush_local_hits)
+        except Exception as e:
+            print(f"Error in rate limit flush: {e}")
+
 # Start background tasks
 @app.on_event("startup")
 async def startup_event():
@@ -56,6 +79,9 @@ async def startup_event():
     if ENVIRONMENT == "production":
         # Only run cleanup tasks in production
         asyncio.create_task(periodic_cleanup())
+    asyncio.create_task(periodic_stats_flush())
+    if limiter.fast_path:
+        asyncio.create_task(periodic_rate_limit_flush())
     print(f"🚀 Portfolio API started in {ENVIRONMENT} mode")
     print("💡 Aby zainicjalizować dane i utworzyć administratora:")
     print("   docker compose exec web python app/create_admin.py")
@@ -63,6 +89,9 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup when application shuts down"""
+    user_stats_buffer.flush()
+    limiter.flush_local_hits()
+    password_executor.shutdown()
     print("👋 Portfolio API shutting down...")
 
 # CORS Configuration - Production ready
@@ -227,6 +256,15 @@ async def manual_cleanup(
             detail={"translation_code": "CLEANUP_TASK_ERROR", "message": "Wystąpił błąd podczas uruchamiania zadań czyszczenia."}
         )
 
+@app.get("/api/admin/password-hashing")
+async def password_hashing_metrics(
+    current_user = Depends(get_current_admin_user)
+):
+    """
+    Password hashing executor load - queue depth, rejections, wait and run times (admin only)
+    """
+    return password_executor.metrics()
+
 
 if __name__ == "__main__":
     uvicorn.run(
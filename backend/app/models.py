@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON, UniqueConstraint, Enum as SQLEnum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime, Boolean, ForeignKey, JSON, UniqueConstraint, Index, Table, Enum as SQLEnum
+from sqlalchemy.orm import relationship, validates
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.sql import func
 from enum import Enum
+from datetime import datetime, timezone
+import math
 from app.database import Base
+from app.datetime_utils import make_timezone_aware
 
 # Enums for user roles and ranks
 class UserRoleEnum(str, Enum):
@@ -69,6 +73,14 @@ class UserRank(Base):
     # Relationships
     users = relationship("User", back_populates="rank")
 
+# Post <-> tag association (primary key covers post lookups, tag_id index covers tag filters)
+blog_post_tags = Table(
+    "blog_post_tags",
+    Base.metadata,
+    Column("post_id", Integer, ForeignKey("blog_posts.id", ondelete="CASCADE"), primary_key=True),
+    Column("tag_id", Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True, index=True),
+)
+
 class BlogPost(Base):
     __tablename__ = "blog_posts"
     
@@ -92,10 +104,28 @@ class BlogPost(Base):
     category = Column(String(50), default="general")  # general, gamedev, python, tutorial, etc.
     
     # Relationships
-    tags = relationship("BlogTag", back_populates="post")
+    tags = relationship("Tag", secondary=blog_post_tags, back_populates="posts", order_by="Tag.tag_name")
     author_user = relationship("User", back_populates="blog_posts")
     translations = relationship("BlogPostTranslation", back_populates="post", cascade="all, delete-orphan")
     comments = relationship("Comment", back_populates="post", cascade="all, delete-orphan")
+    documents = relationship("BlogPostDocument", back_populates="post", cascade="all, delete-orphan")
+    comment_stats = relationship("BlogPostCommentStats", uselist=False, cascade="all, delete-orphan")
+    
+    # ⚡ Composite indexes for keyset (cursor) pagination of listings
+    __table_args__ = (
+        Index(
+            "ix_blog_posts_published_at_id", "published_at", "id",
+            postgresql_ops={"published_at": "DESC NULLS LAST", "id": "DESC"}
+        ),
+        Index("ix_blog_posts_created_at_id", "created_at", "id"),
+    )
+
+WORDS_PER_MINUTE = 200  # Average reading speed used for reading time estimates
+
+def estimate_reading_time(content: str) -> int:
+    """Estimated reading time in minutes (at least 1)"""
+    words = len(content.split()) if content else 0
+    return max(1, round(words / WORDS_PER_MINUTE))
 
 class BlogPostTranslation(Base):
     __tablename__ = "blog_post_translations"
@@ -108,6 +138,10 @@ class BlogPostTranslation(Base):
     title = Column(String(200), nullable=False, index=True)
     content = Column(Text, nullable=False)
     excerpt = Column(Text)
+    reading_time = Column(Integer)  # Minutes, precomputed so listings can skip loading content
+    
+    # Full-text search document (PostgreSQL tsvector, maintained by app.search)
+    search_vector = Column(Text().with_variant(TSVECTOR(), "postgresql"))
     
     # SEO per language
     meta_title = Column(String(200))
@@ -122,16 +156,66 @@ class BlogPostTranslation(Base):
     language = relationship("Language")
     
     # Ensure one translation per language per post
-    __table_args__ = (UniqueConstraint('post_id', 'language_code', name='uq_post_language'),)
+    __table_args__ = (
+        UniqueConstraint('post_id', 'language_code', name='uq_post_language'),
+        Index("ix_blog_post_translations_search_vector", "search_vector", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
+    
+    @validates("content")
+    def _update_reading_time(self, key, content):
+        """Keep reading_time in sync with every content write"""
+        self.reading_time = estimate_reading_time(content)
+        return content
+
+class BlogPostDocument(Base):
+    """Pre-rendered JSON of a post in one language - maintained by app.post_documents"""
+    __tablename__ = "blog_post_documents"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    post_id = Column(Integer, ForeignKey("blog_posts.id", ondelete="CASCADE"), nullable=False)
+    language_code = Column(String(10), nullable=False)
+    
+    # Encoded single-language post (summary omits content - used by listings)
+    summary = Column(Text, nullable=False)
+    full = Column(Text, nullable=False)
+    
+    # Validators of the rendered source (ETag / Last-Modified)
+    version = Column(String(40), nullable=False)
+    source_updated_at = Column(DateTime)
+    
+    rendered_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    
+    post = relationship("BlogPost", back_populates="documents")
+    
+    __table_args__ = (
+        UniqueConstraint('post_id', 'language_code', name='uq_post_document_language'),
+    )
+
+class Tag(Base):
+    """Normalized blog tag with a maintained published-post counter (facets)"""
+    __tablename__ = "tags"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    tag_name = Column(String(50), unique=True, nullable=False, index=True)
+    
+    # Number of published posts with this tag - kept in sync by app.tag_utils
+    published_post_count = Column(Integer, nullable=False, default=0, server_default="0")
+    
+    created_at = Column(DateTime, server_default=func.now())
+    
+    posts = relationship("BlogPost", secondary=blog_post_tags, back_populates="tags")
+    
+    __table_args__ = (
+        Index("ix_tags_published_post_count", "published_post_count"),
+    )
 
 class BlogTag(Base):
+    """Legacy per-post tag rows - superseded by Tag, emptied by data_migrations.migrate_legacy_tags"""
     __tablename__ = "blog_tags"
     
     id = Column(Integer, primary_key=True, index=True)
     post_id = Column(Integer, ForeignKey("blog_posts.id"))
     tag_name = Column(String(50), nullable=False)
-    
-    post = relationship("BlogPost", back_populates="tags")
 
 # Enhanced User model with security features
 class User(Base):
@@ -152,6 +236,7 @@ class User(Base):
     # 🎯 NEW MODULAR ROLE AND RANK SYSTEM
     role_id = Column(Integer, ForeignKey("user_roles.id"), nullable=True)
     rank_id = Column(Integer, ForeignKey("user_ranks.id"), nullable=True)
+    role_version = Column(Integer, nullable=False, default=0, server_default="0")  # Bumped on role change - older claim tokens must refresh
     
     # Statistics for automatic rank upgrades
     total_comments = Column(Integer, default=0)
@@ -164,6 +249,7 @@ class User(Base):
     verification_code_hash = Column(String(255))  # Hashed verification code
     verification_token = Column(String(500))  # JWT token for verification
     verification_expires_at = Column(DateTime)
+    verification_attempts = Column(Integer, nullable=False, default=0, server_default="0")  # Checks of the current code - reset when a new one is issued
     
     # Security features
     failed_login_attempts = Column(Integer, default=0)
@@ -274,6 +360,16 @@ class Language(Base):
     # Relationships
     creator = relationship("User")
 
+HOT_SCORE_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+HOT_SCORE_DECAY_SECONDS = 45000  # 12.5h newer outweighs 10x more votes
+
+def comment_hot_score(score: int, created_at: datetime) -> float:
+    """Time-decayed ranking value - fixed per vote count, newer comments naturally rank higher"""
+    order = math.log10(max(abs(score), 1))
+    sign = (score > 0) - (score < 0)
+    age = (make_timezone_aware(created_at) - HOT_SCORE_EPOCH).total_seconds()
+    return round(sign * order + age / HOT_SCORE_DECAY_SECONDS, 7)
+
 class Comment(Base):
     """Model for blog post comments"""
     __tablename__ = "comments"
@@ -289,6 +385,15 @@ class Comment(Base):
     # Moderation
     is_deleted = Column(Boolean, default=False)  # Soft delete
     
+    # ⚡ Denormalized counters - maintained by the comments router, no like rows needed to read them
+    likes_count = Column(Integer, nullable=False, default=0, server_default="0")
+    dislikes_count = Column(Integer, nullable=False, default=0, server_default="0")
+    replies_count = Column(Integer, nullable=False, default=0, server_default="0")  # Non-deleted replies
+    
+    # Ranking - score = likes - dislikes, hot_score = comment_hot_score (0 until backfilled)
+    score = Column(Integer, nullable=False, default=0, server_default="0")
+    hot_score = Column(Float, nullable=False, default=lambda: comment_hot_score(0, datetime.now(timezone.utc)), server_default="0")
+    
     # Tracking
     ip_address = Column(String(45))
     
@@ -302,6 +407,22 @@ class Comment(Base):
     parent = relationship("Comment", remote_side=[id], back_populates="replies")
     replies = relationship("Comment", back_populates="parent", cascade="all, delete-orphan")
     likes = relationship("CommentLike", back_populates="comment", cascade="all, delete-orphan")
+    
+    # ⚡ Thread ordering indexes - (post, level) prefix + sort key + id tie-breaker for keyset paging
+    __table_args__ = (
+        Index("ix_comments_thread_created_at", "post_id", "parent_id", "created_at", "id"),
+        Index("ix_comments_thread_likes", "post_id", "parent_id", "likes_count", "id"),
+        Index("ix_comments_thread_score", "post_id", "parent_id", "score", "id"),
+        Index("ix_comments_thread_hot", "post_id", "parent_id", "hot_score", "id"),
+    )
+
+class BlogPostCommentStats(Base):
+    """Maintained comment counters of a post - kept apart from blog_posts so comments don't bump updated_at"""
+    __tablename__ = "blog_post_comment_stats"
+    
+    post_id = Column(Integer, ForeignKey("blog_posts.id", ondelete="CASCADE"), primary_key=True)
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")  # Non-deleted comments and replies
+    reply_count = Column(Integer, nullable=False, default=0, server_default="0")  # Non-deleted replies
 
 class CommentLike(Base):
     """Model for comment likes/dislikes"""
@@ -0,0 +1,93 @@
+"""
+Keyset (cursor) pagination helpers
+
+A cursor encodes the sort key of the last row of a page, so the next page is a
+range scan on a (sort column, id) index instead of OFFSET - deep pages cost the
+same as the first one.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, tuple_
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail={"translation_code": "INVALID_CURSOR", "message": "Invalid pagination cursor"}
+    )
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode sort key values into an opaque URL-safe cursor"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Decode cursor into list of `size` values (raises 400 on malformed input)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise _invalid_cursor()
+
+    if not isinstance(values, list) or len(values) != size:
+        raise _invalid_cursor()
+    return values
+
+
+def decode_keyset_cursor(cursor: str) -> Tuple[Any, int]:
+    """Decode (sort value, id) cursor"""
+    value, last_id = decode_cursor(cursor, 2)
+    if not isinstance(last_id, int) or isinstance(last_id, bool):
+        raise _invalid_cursor()
+    return value, last_id
+
+
+def decode_datetime(value: Any) -> datetime:
+    """Parse datetime stored in cursor"""
+    try:
+        return datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        raise _invalid_cursor()
+
+
+def decode_number(value: Any) -> float:
+    """Validate numeric sort value stored in cursor"""
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        raise _invalid_cursor()
+    return value
+
+
+def keyset_order(column, id_column, descending: bool, nullable: bool = True) -> list:
+    """ORDER BY matching `keyset_after` (NULLs last when descending, first when ascending)"""
+    if not nullable:
+        # Plain order - matches a default (column, id) btree index scanned either way
+        if descending:
+            return [column.desc(), id_column.desc()]
+        return [column.asc(), id_column.asc()]
+    if descending:
+        return [column.desc().nullslast(), id_column.desc()]
+    return [column.asc().nullsfirst(), id_column.asc()]
+
+
+def keyset_after(column, id_column, value: Any, last_id: int, descending: bool, nullable: bool = True):
+    """Filter selecting rows strictly after (value, last_id) in `keyset_order`"""
+    if not nullable:
+        if descending:
+            return tuple_(column, id_column) < tuple_(value, last_id)
+        return tuple_(column, id_column) > tuple_(value, last_id)
+
+    if descending:
+        if value is None:
+            return and_(column.is_(None), id_column < last_id)
+        return or_(tuple_(column, id_column) < tuple_(value, last_id), column.is_(None))
+
+    if value is None:
+        return or_(and_(column.is_(None), id_column > last_id), column.isnot(None))
+    return tuple_(column, id_column) > tuple_(value, last_id)
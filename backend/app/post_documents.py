@@ -0,0 +1,170 @@
+"""
+Serialized blog post documents
+
+A post in a given language is rendered to JSON once, when the post, one of its
+translations or its tags change, and stored in blog_post_documents. Public
+single-language reads return these pre-encoded bytes instead of building ORM
+objects and dictionaries on every request. Posts written before documents
+existed are rendered in memory on read until `python app/data_migrations.py
+post-documents` stores their documents.
+"""
+import json
+from typing import Dict, Iterable
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session, selectinload
+
+from .http_cache import make_etag, latest
+from .models import BlogPost, BlogPostTranslation, BlogPostDocument
+
+
+def serialize_translation(t: BlogPostTranslation, include_content: bool = True) -> dict:
+    """Translation as returned by the API (content omitted in summary view)"""
+    data = {
+        "id": t.id,
+        "language_code": t.language_code,
+        "title": t.title,
+        "excerpt": t.excerpt,
+        "reading_time": t.reading_time,
+        "meta_title": t.meta_title,
+        "meta_description": t.meta_description,
+        "created_at": t.created_at,
+        "updated_at": t.updated_at
+    }
+    if include_content:
+        data["content"] = t.content
+    return data
+
+
+def serialize_post_single_language(post: BlogPost, translation: BlogPostTranslation, include_content: bool = True) -> dict:
+    """Post flattened into one language (content omitted in summary view)"""
+    data = {
+        "id": post.id,
+        "slug": post.slug,
+        "title": translation.title,
+        "excerpt": translation.excerpt,
+        "reading_time": translation.reading_time,
+        "author": post.author,
+        "author_id": post.author_id,
+        "meta_title": translation.meta_title,
+        "meta_description": translation.meta_description,
+        "language_code": translation.language_code,
+        "category": post.category,
+        "featured_image": post.featured_image,
+        "created_at": post.created_at,
+        "updated_at": post.updated_at,
+        "is_published": post.is_published,
+        "published_at": post.published_at,
+        "tags": [tag.tag_name for tag in post.tags] if post.tags else []
+    }
+    if include_content:
+        data["content"] = translation.content
+    return data
+
+
+def serialize_post_multilingual(post: BlogPost, include_content: bool = True) -> dict:
+    """Post with all of its translations (content omitted in summary view)"""
+    return {
+        "id": post.id,
+        "slug": post.slug,
+        "author": post.author,
+        "author_id": post.author_id,
+        "category": post.category,
+        "featured_image": post.featured_image,
+        "created_at": post.created_at,
+        "updated_at": post.updated_at,
+        "is_published": post.is_published,
+        "published_at": post.published_at,
+        "tags": [tag.tag_name for tag in post.tags] if post.tags else [],
+        "translations": [serialize_translation(t, include_content) for t in post.translations]
+    }
+
+
+def post_version(post: BlogPost) -> tuple:
+    """Version tuple of a loaded post - changes whenever the post, a translation or the tag set changes"""
+    return (
+        post.id,
+        post.updated_at,
+        tuple(sorted((t.language_code, t.updated_at) for t in post.translations)),
+        tuple(sorted(tag.tag_name for tag in post.tags))
+    )
+
+
+def encode_document(data) -> str:
+    """Compact JSON, encoded the same way FastAPI encodes a returned dict"""
+    return json.dumps(jsonable_encoder(data), ensure_ascii=False, separators=(",", ":"))
+
+
+def document_fields(post: BlogPost, translation: BlogPostTranslation) -> dict:
+    """Column values of the document of a post in the translation's language"""
+    tag_names = tuple(sorted(tag.tag_name for tag in post.tags))
+    return {
+        "summary": encode_document(serialize_post_single_language(post, translation, include_content=False)),
+        "full": encode_document(serialize_post_single_language(post, translation)),
+        "version": make_etag(post.id, post.updated_at, translation.language_code, translation.updated_at, tag_names),
+        "source_updated_at": latest(post.updated_at, translation.updated_at)
+    }
+
+
+def missing_documents(db: Session, post_ids: Iterable[int], language: str) -> Dict[int, dict]:
+    """
+    {post_id: document_fields} rendered in memory for posts without a stored document
+    Read paths use it until data_migrations renders the documents; nothing is written.
+    """
+    post_ids = set(post_ids)
+    if not post_ids:
+        return {}
+    rows = db.query(BlogPost, BlogPostTranslation).join(
+        BlogPostTranslation, BlogPostTranslation.post_id == BlogPost.id
+    ).filter(
+        BlogPost.id.in_(post_ids),
+        BlogPostTranslation.language_code == language
+    ).options(selectinload(BlogPost.tags))
+    return {post.id: document_fields(post, translation) for post, translation in rows}
+
+
+def render_post_documents(db: Session, post_id: int) -> None:
+    """
+    Regenerate the documents of a post for all of its languages (call before commit)
+    Documents of removed translations are deleted.
+    """
+    db.flush()
+    post = db.query(BlogPost).options(
+        selectinload(BlogPost.translations),
+        selectinload(BlogPost.tags),
+        selectinload(BlogPost.documents)
+    ).populate_existing().filter(BlogPost.id == post_id).first()
+    if post is None:
+        return
+
+    documents = {document.language_code: document for document in post.documents}
+    for translation in post.translations:
+        document = documents.pop(translation.language_code, None)
+        if document is None:
+            document = BlogPostDocument(language_code=translation.language_code)
+            post.documents.append(document)
+
+        for field, value in document_fields(post, translation).items():
+            setattr(document, field, value)
+
+    for document in documents.values():
+        post.documents.remove(document)
+    db.flush()
+
+
+def paginated_json(documents: Iterable[str], **meta) -> bytes:
+    """PaginatedResponse body with pre-encoded items spliced in"""
+    items = ",".join(documents)
+    rest = json.dumps(jsonable_encoder(meta), ensure_ascii=False, separators=(",", ":"))[1:]
+    return f'{{"items":[{items}]{"," if meta else ""}{rest}'.encode()
+
+
+def with_comment_count(document: str, comment_count: int) -> str:
+    """Pre-encoded document with the live comment_count key appended"""
+    return f'{document[:-1]},"comment_count":{int(comment_count)}}}'
+
+
+def json_response(body: bytes, status_code: int = 200) -> Response:
+    """Response carrying an already encoded JSON body"""
+    return Response(content=body, status_code=status_code, media_type="application/json")
@@ -2,8 +2,21 @@
 Utilities for automatic rank management
 """
 
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, update
 from sqlalchemy.orm import Session, joinedload
+from .database import SessionLocal
 from .models import User, UserRank
+from .identity_cache import invalidate_identity
+
+USER_STATS_FLUSH_INTERVAL = float(os.getenv("USER_STATS_FLUSH_INTERVAL", "5"))
+
+logger = logging.getLogger(__name__)
 
 def auto_check_rank_upgrade(user_id: int, db: Session) -> dict:
     """
@@ -22,34 +35,23 @@ def auto_check_rank_upgrade(user_id: int, db: Session) -> dict:
         ).order_by(UserRank.level.desc()).all()
         
         # Sprawdź czy użytkownik kwalifikuje się do wyższej rangi
-        for rank in available_ranks:
-            requirements = rank.requirements or {}
-            comments_req = requirements.get("comments", 0)
-            likes_req = requirements.get("likes", 0)
+        rank = eligible_rank(available_ranks, user.total_comments, user.total_likes_received)
+        if rank and (not user.rank or rank.level > user.rank.level):
+            old_rank_name = user.rank.display_name if user.rank else "Brak rangi"
+            
+            # Awansuj
+            user.rank_id = rank.id
+            db.commit()
+            invalidate_identity(user_id)
             
-            # Sprawdź czy spełnia wymagania
-            if (user.total_comments >= comments_req and 
-                user.total_likes_received >= likes_req):
-                
-                # Sprawdź czy to wyższa ranga niż obecna
-                if not user.rank or rank.level > user.rank.level:
-                    old_rank_name = user.rank.display_name if user.rank else "Brak rangi"
-                    
-                    # Awansuj
-                    user.rank_id = rank.id
-                    db.commit()
-                    
-                    return {
-                        "success": True,
-                        "upgraded": True,
-                        "old_rank": old_rank_name,
-                        "new_rank": rank.display_name,
-                        "new_rank_icon": rank.icon,
-                        "message": f"🎉 Awansowano z {old_rank_name} na {rank.display_name}!"
-                    }
-                else:
-                    # Już ma tę rangę lub wyższą
-                    break
+            return {
+                "success": True,
+                "upgraded": True,
+                "old_rank": old_rank_name,
+                "new_rank": rank.display_name,
+                "new_rank_icon": rank.icon,
+                "message": f"🎉 Awansowano z {old_rank_name} na {rank.display_name}!"
+            }
         
         # Brak awansu
         return {
@@ -62,33 +64,116 @@ def auto_check_rank_upgrade(user_id: int, db: Session) -> dict:
     except Exception as e:
         return {"success": False, "message": f"Error checking rank: {str(e)}"}
 
-def update_user_stats(user_id: int, db: Session, action: str = "comment") -> dict:
+def eligible_rank(ranks: List[UserRank], total_comments: int, total_likes_received: int) -> Optional[UserRank]:
+    """Highest rank whose requirements are met (ranks ordered by level, highest first)"""
+    for rank in ranks:
+        requirements = rank.requirements or {}
+        if (total_comments >= requirements.get("comments", 0) and
+                total_likes_received >= requirements.get("likes", 0)):
+            return rank
+    return None
+
+
+class UserStatsBuffer:
     """
-    Aktualizuj statystyki użytkownika i sprawdź awans
-    action: 'comment' (dodaj komentarz) lub 'like_received' (otrzymał lajka)
+    Write-behind aggregation of user stat increments
+    Requests only record deltas in memory; flush() applies them in one batched
+    UPDATE ... SET total = total + n and evaluates rank upgrades for the flushed
+    users only. Upgrades are kept until the user's next request picks them up.
+    Pending deltas live in this process - they are lost on a hard crash (at most
+    one flush interval), a clean shutdown flushes them.
     """
-    try:
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            return {"success": False, "message": "User not found"}
-        
-        # Aktualizuj statystyki
-        if action == "comment":
-            user.total_comments += 1
-        elif action == "like_received":
-            user.total_likes_received += 1
-        
+
+    def __init__(self, max_upgrades: int = 10000):
+        self._pending: Dict[int, List[int]] = {}  # user_id -> [comments, likes_received]
+        self._upgrades: "OrderedDict[int, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.max_upgrades = max_upgrades
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def record(self, user_id: int, action: str = "comment") -> None:
+        """Queue +1 of 'comment' (dodany komentarz) or 'like_received' (otrzymany lajk)"""
+        with self._lock:
+            delta = self._pending.setdefault(user_id, [0, 0])
+            if action == "comment":
+                delta[0] += 1
+            elif action == "like_received":
+                delta[1] += 1
+
+    def take_rank_upgrade(self, user_id: int) -> Optional[dict]:
+        """Pop a rank upgrade applied by a flush (reported once, in the user's next response)"""
+        with self._lock:
+            return self._upgrades.pop(user_id, None)
+
+    def flush(self) -> int:
+        """Apply pending deltas and upgrade ranks, returns number of flushed users"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            db = SessionLocal()
+            try:
+                upgrades = self._apply(db, pending)
+            except Exception as e:
+                db.rollback()
+                # Keep the deltas for the next flush
+                with self._lock:
+                    for user_id, (comments, likes) in pending.items():
+                        delta = self._pending.setdefault(user_id, [0, 0])
+                        delta[0] += comments
+                        delta[1] += likes
+                logger.error(f"Error flushing user stats: {str(e)}")
+                return 0
+            finally:
+                db.close()
+
+            with self._lock:
+                for user_id, upgrade in upgrades.items():
+                    self._upgrades[user_id] = upgrade
+                    self._upgrades.move_to_end(user_id)
+                while len(self._upgrades) > self.max_upgrades:
+                    self._upgrades.popitem(last=False)
+            return len(pending)
+
+    def _apply(self, db: Session, pending: Dict[int, List[int]]) -> Dict[int, dict]:
+        users_table = User.__table__
+        # Core executemany - one prepared UPDATE for all users of the batch
+        db.connection().execute(
+            update(users_table).where(users_table.c.id == bindparam("user_id")).values(
+                total_comments=users_table.c.total_comments + bindparam("comments"),
+                total_likes_received=users_table.c.total_likes_received + bindparam("likes")
+            ),
+            [{"user_id": user_id, "comments": comments, "likes": likes}
+             for user_id, (comments, likes) in pending.items()]
+        )
+
+        # Rank evaluation for the flushed users only - one query for users, one for ranks
+        ranks = db.query(UserRank).filter(UserRank.is_active == True).order_by(UserRank.level.desc()).all()
+        users = db.query(User).options(joinedload(User.rank)).filter(User.id.in_(pending)).all()
+        upgrades = {}
+        for user in users:
+            rank = eligible_rank(ranks, user.total_comments or 0, user.total_likes_received or 0)
+            if rank and (not user.rank or rank.level > user.rank.level):
+                old_rank_name = user.rank.display_name if user.rank else "Brak rangi"
+                user.rank_id = rank.id
+                upgrades[user.id] = {
+                    "success": True,
+                    "upgraded": True,
+                    "old_rank": old_rank_name,
+                    "new_rank": rank.display_name,
+                    "new_rank_icon": rank.icon,
+                    "message": f"🎉 Awansowano z {old_rank_name} na {rank.display_name}!"
+                }
         db.commit()
-        
-        # Sprawdź awans po aktualizacji statystyk
-        rank_result = auto_check_rank_upgrade(user_id, db)
-        
-        return {
-            "success": True,
-            "stats_updated": True,
-            "action": action,
-            "rank_check": rank_result
-        }
-        
-    except Exception as e:
-        return {"success": False, "message": f"Error updating stats: {str(e)}"}
+        if upgrades:
+            invalidate_identity(*upgrades)
+        return upgrades
+
+
+user_stats_buffer = UserStatsBuffer()
@@ -0,0 +1,210 @@
+"""
+Rate-limit storage shared between workers
+
+slowapi keeps its counters in the memory of one process by default, so with N
+uvicorn workers every limit is effectively N times higher. RATE_LIMIT_STORAGE_URI
+selects where the counters live:
+
+    memory://                    per process (default, single worker / development)
+    sqlite:////dev/shm/rl.db     file shared by all workers on one host (SqliteStorage below)
+    redis://host:6379/0          Redis or any server speaking its protocol (needs the redis package)
+
+With a shared storage every hit costs a round trip. Generous limits (at least
+RATE_LIMIT_LOCAL_MIN requests per window) take the local fast path: while a
+key's last known shared count is below half of its limit, each worker admits up
+to a tenth of the limit on its own. Those hits reach the storage with the next
+synchronizing hit of the key or with the flush main.py runs every
+RATE_LIMIT_SYNC_INTERVAL seconds, whichever comes first. Strict limits (login,
+registration, password reset) always go to the storage.
+
+The same storage keeps other short-lived state every worker must see (revoked
+claim access tokens, see security.revoke_claims).
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from limits.storage import Storage, storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+from slowapi import Limiter
+
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+RATE_LIMIT_LOCAL_MIN = int(os.getenv("RATE_LIMIT_LOCAL_MIN", "100"))  # 0 disables the fast path
+RATE_LIMIT_SYNC_INTERVAL = float(os.getenv("RATE_LIMIT_SYNC_INTERVAL", "1"))
+RATE_LIMIT_LOCAL_KEYS = 10000
+
+
+class SqliteStorage(Storage):
+    """
+    Fixed-window counters in an SQLite file (sqlite:///relative.db, sqlite:////absolute.db)
+    Every worker opens the same file, each increment is a single upsert.
+    """
+    STORAGE_SCHEME = ["sqlite"]
+    PURGE_EVERY = 1000  # Increments between deletions of expired windows
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.path = uri.split("://", 1)[1][1:]
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            self.path, timeout=float(options.get("timeout", 5)), isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits "
+            "(key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._increments = 0
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        now = time.time()
+        with self._lock:
+            self._increments += 1
+            if self._increments % self.PURGE_EVERY == 0:
+                self._connection.execute("DELETE FROM rate_limits WHERE expires_at <= ?", (now,))
+            # An expired window restarts at `amount` instead of adding to it
+            (count,) = self._connection.execute(
+                "INSERT INTO rate_limits (key, count, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET "
+                "count = CASE WHEN expires_at <= ? THEN excluded.count ELSE count + excluded.count END, "
+                "expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END "
+                "RETURNING count",
+                (key, amount, now + expiry, now, now)
+            ).fetchone()
+        return count
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT count FROM rate_limits WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT expires_at FROM rate_limits WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self) -> bool:
+        try:
+            with self._lock:
+                self._connection.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int:
+        with self._lock:
+            return self._connection.execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+
+class LocalFastPathRateLimiter(FixedWindowRateLimiter):
+    """Fixed window that batches hits of keys far below their limit before writing them to the storage"""
+
+    def __init__(self, storage: Storage, local_min: int = RATE_LIMIT_LOCAL_MIN,
+                 sync_interval: float = RATE_LIMIT_SYNC_INTERVAL):
+        super().__init__(storage)
+        self.local_min = local_min
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        # key -> [shared count at last sync, local hits not pushed yet, time of last sync, window length]
+        self._local: "OrderedDict[str, list]" = OrderedDict()
+
+    def hit(self, item, *identifiers: str, cost: int = 1) -> bool:
+        if not self.local_min or item.amount < self.local_min:
+            return super().hit(item, *identifiers, cost=cost)
+
+        key = item.key_for(*identifiers)
+        now = time.monotonic()
+        with self._lock:
+            state = self._local.get(key)
+            if state is not None:
+                seen, pending, synced_at, _ = state
+                if (now - synced_at < self.sync_interval
+                        and seen + pending + cost <= item.amount // 2
+                        and pending + cost <= item.amount // 10):
+                    state[1] += cost
+                    self._local.move_to_end(key)
+                    return True
+                state[1] = 0
+            else:
+                pending = 0
+
+        count = self.storage.incr(key, item.get_expiry(), amount=pending + cost)
+        evicted = None
+        with self._lock:
+            state = self._local.get(key)
+            if state is None:
+                self._local[key] = [count, 0, now, item.get_expiry()]
+                if len(self._local) > RATE_LIMIT_LOCAL_KEYS:
+                    evicted = self._local.popitem(last=False)
+            else:
+                state[0], state[2] = count, now
+                self._local.move_to_end(key)
+        if evicted and evicted[1][1]:
+            self.storage.incr(evicted[0], evicted[1][3], amount=evicted[1][1])
+        return count <= item.amount
+
+    def flush(self) -> int:
+        """Push locally admitted hits of every key to the storage (run every RATE_LIMIT_SYNC_INTERVAL seconds)"""
+        with self._lock:
+            batches = []
+            for key, state in self._local.items():
+                if state[1]:
+                    batches.append((key, state[1], state[3]))
+                    state[1] = 0
+
+        now = time.monotonic()
+        for key, pending, expiry in batches:
+            count = self.storage.incr(key, expiry, amount=pending)
+            with self._lock:
+                state = self._local.get(key)
+                if state is not None:
+                    state[0], state[2] = count, now
+        return len(batches)
+
+
+class SharedLimiter(Limiter):
+    """slowapi Limiter that puts the local fast path in front of a shared storage"""
+
+    def __init__(self, key_func, storage_uri: str, fast_path: bool, **kwargs):
+        super().__init__(key_func=key_func, storage_uri=storage_uri, **kwargs)
+        self.fast_path = fast_path
+
+    @property
+    def limiter(self):
+        limiter = super().limiter
+        # slowapi builds plain strategies (at start and on init_app) - wrap the storage-backed one again
+        if self.fast_path and limiter is self._limiter and not isinstance(limiter, LocalFastPathRateLimiter):
+            self._limiter = limiter = LocalFastPathRateLimiter(self._storage)
+        return limiter
+
+    def flush_local_hits(self) -> int:
+        """Push hits admitted on the fast path to the shared storage"""
+        if self.fast_path and isinstance(self._limiter, LocalFastPathRateLimiter):
+            return self._limiter.flush()
+        return 0
+
+
+def create_shared_storage(storage_uri: str = RATE_LIMIT_STORAGE_URI) -> Storage:
+    """Separate connection to the rate-limit storage (per process for memory://)"""
+    return storage_from_string(storage_uri)
+
+
+def create_limiter(key_func, storage_uri: str = RATE_LIMIT_STORAGE_URI) -> SharedLimiter:
+    """Limiter on the configured storage (shared storages get the local fast path and an in-memory fallback)"""
+    if storage_uri.startswith("memory://"):
+        return SharedLimiter(key_func, storage_uri, fast_path=False)
+    return SharedLimiter(key_func, storage_uri, fast_path=bool(RATE_LIMIT_LOCAL_MIN), in_memory_fallback_enabled=True)
@@ -17,15 +17,16 @@ from ..schemas import (
     PasswordResetConfirm, UserRegistrationRequest
 )
 from ..security import (
-    verify_password, get_password_hash, create_access_token, create_refresh_token,
+    get_password_hash_async, create_access_token, access_token_data, create_refresh_token,
     authenticate_user, get_current_active_user, get_current_admin_user,
     generate_api_key, hash_api_key, rate_limit_by_ip, admin_rate_limit,
     strict_rate_limit_login, handle_failed_login, is_email_valid, 
     is_password_strong, get_security_headers, generate_verification_code,
     generate_verification_token, create_verification_token, verify_verification_token,
-    hash_verification_code, verify_verification_code, set_auth_cookies, clear_auth_cookies
+    hash_verification_code, verify_verification_code_async, reserve_verification_attempt, set_auth_cookies, clear_auth_cookies
 )
 from ..email_service import EmailService
+from ..identity_cache import invalidate_identity
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
@@ -71,6 +72,7 @@ async def register_user(
                 
                 # Update existing user with new verification data
                 existing_user.verification_code_hash = hash_verification_code(verification_code)
+                existing_user.verification_attempts = 0
                 existing_user.verification_token = verification_token
                 existing_user.verification_expires_at = datetime.now(timezone.utc) + timedelta(minutes=15)
                 
@@ -108,7 +110,7 @@ async def register_user(
     verification_token = create_verification_token(user_data.email, verification_code)
     
     # Hash password
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     
     # Get default role and rank for new users
     default_role = db.query(UserRole).filter(UserRole.name == UserRoleEnum.USER).first()
@@ -221,8 +223,15 @@ async def verify_email(
             detail={"translation_code": "VERIFICATION_CODE_EXPIRED", "message": "Verification code expired. Please request a new one."}
         )
     
+    # Each issued code allows a limited number of guesses
+    if not reserve_verification_attempt(db, user.id):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail={"translation_code": "VERIFICATION_ATTEMPTS_EXCEEDED", "message": "Too many invalid verification codes. Please request a new one."}
+        )
+    
     # Verify the code
-    if not user.verification_code_hash or not verify_verification_code(
+    if not user.verification_code_hash or not await verify_verification_code_async(
         verification_data.verification_code, 
         user.verification_code_hash
     ):
@@ -237,14 +246,16 @@ async def verify_email(
     user.verification_code_hash = None
     user.verification_token = None
     user.verification_expires_at = None
+    user.verification_attempts = 0
     
     db.commit()
     db.refresh(user)
+    invalidate_identity(user.id)
     
     # Create access token
     access_token_expires = timedelta(minutes=15)  # Changed to 15 minutes
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data=access_token_data(user), expires_delta=access_token_expires
     )
     
     refresh_token = create_refresh_token(user.id)
@@ -289,6 +300,7 @@ async def resend_verification_code(
     
     # Update user verification data
     user.verification_code_hash = hash_verification_code(verification_code)
+    user.verification_attempts = 0
     user.verification_token = verification_token
     user.verification_expires_at = datetime.now(timezone.utc) + timedelta(minutes=15)
     
@@ -325,7 +337,7 @@ async def login_user(
 ):
     """Login user with email and password (email-only authentication)"""
     # Try to authenticate with email only
-    user = authenticate_user(db, form_data.username, form_data.password)  # username field contains email
+    user = await authenticate_user(db, form_data.username, form_data.password)  # username field contains email
     
     if not user:
         # Handle failed login attempt
@@ -364,7 +376,7 @@ async def login_user(
     
     access_token_expires = timedelta(minutes=15)  # Changed to 15 minutes
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires  # Use email as subject
+        data=access_token_data(user), expires_delta=access_token_expires
     )
     
     refresh_token = create_refresh_token(user.id)
@@ -449,7 +461,7 @@ async def refresh_token(
     
     # Create new access token
     access_token = create_access_token(
-        data={"sub": user.email}, 
+        data=access_token_data(user), 
         expires_delta=timedelta(minutes=15)
     )
     
@@ -565,7 +577,7 @@ async def confirm_password_reset(
         )
     
     # Update password
-    user.hashed_password = get_password_hash(reset_data.new_password)
+    user.hashed_password = await get_password_hash_async(reset_data.new_password)
     user.password_reset_token = None
     user.password_reset_expires_at = None
     user.failed_login_attempts = 0  # Reset failed attempts
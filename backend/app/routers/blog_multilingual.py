@@ -1,17 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import and_, func
+from sqlalchemy.orm import Session, joinedload, contains_eager, defer, selectinload
 from typing import List, Optional
 from datetime import datetime, timezone
 import re
 
 from ..database import get_db
-from ..models import BlogPost, BlogPostTranslation, BlogTag, User, Language
+from ..models import BlogPost, BlogPostTranslation, BlogPostDocument, BlogTag, Tag, User, Language, blog_post_tags
 from ..schemas import (
     BlogPostCreate, BlogPostUpdate, BlogPostPublic, BlogPostAdmin, 
     BlogPostSingleLanguage, BlogPostTranslationCreate, BlogPostTranslationUpdate,
-    APIResponse, PaginatedResponse
+    APIResponse, PaginatedResponse, TagFacet
 )
 from ..security import get_current_admin_user
+from ..http_cache import make_etag, latest, is_not_modified, set_cache_headers, not_modified
+from ..pagination import (
+    encode_cursor, decode_keyset_cursor, decode_datetime, decode_number, keyset_order, keyset_after
+)
+from ..search import search_posts
+from ..tag_utils import get_or_create_tags, refresh_tag_counts, tag_filter
+from ..post_documents import (
+    serialize_translation, serialize_post_single_language, serialize_post_multilingual,
+    post_version, render_post_documents, missing_documents, paginated_json, json_response, with_comment_count
+)
+from ..comment_stats import load_comment_stats
+from ..blog_cache import (
+    blog_list_cache, listing_cache_key, parse_id_list, parse_tag_list,
+    post_scope, invalidate_post, cached_count
+)
 
 router = APIRouter()
 
@@ -34,8 +50,48 @@ def create_slug(title: str) -> str:
     slug = re.sub(r'[\s-]+', '-', slug)       # Replace spaces/hyphens with single hyphen
     return slug.strip('-')
 
+def cursor_filter(cursor: str, sort_column, descending: bool):
+    """Translate (sort value, id) cursor into keyset filter on BlogPost"""
+    value, last_id = decode_keyset_cursor(cursor)
+    return keyset_after(
+        sort_column, BlogPost.id,
+        decode_datetime(value) if value is not None else None,
+        last_id, descending
+    )
+
+def query_post_version(db: Session, slug: str, language: Optional[str] = None) -> Optional[tuple]:
+    """Same version tuple as post_version, read from indexed columns without loading content"""
+    translation_join = BlogPostTranslation.post_id == BlogPost.id
+    if language:
+        translation_join = and_(translation_join, BlogPostTranslation.language_code == language)
+    
+    rows = db.query(
+        BlogPost.id, BlogPost.updated_at,
+        BlogPostTranslation.language_code, BlogPostTranslation.updated_at
+    ).outerjoin(BlogPostTranslation, translation_join).filter(BlogPost.slug == slug).all()
+    
+    if not rows:
+        return None
+    
+    post_id, updated_at = rows[0][0], rows[0][1]
+    tags = db.query(Tag.tag_name).join(
+        blog_post_tags, blog_post_tags.c.tag_id == Tag.id
+    ).filter(blog_post_tags.c.post_id == post_id).all()
+    return (
+        post_id,
+        updated_at,
+        tuple(sorted((code, ts) for _, _, code, ts in rows if code is not None)),
+        tuple(sorted(name for (name,) in tags))
+    )
+
+def version_last_modified(version: tuple) -> Optional[datetime]:
+    """Last-Modified of a version tuple (newest of post and translation timestamps)"""
+    return latest(version[1], *(ts for _, ts in version[2]))
+
 @router.get("/", response_model=PaginatedResponse)
 async def get_blog_posts(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=100),
@@ -43,132 +99,233 @@ async def get_blog_posts(
     category: Optional[str] = Query(None),
     published_only: bool = Query(True),
     tags: Optional[str] = Query(None, description="Comma-separated list of tags"),
+    tag_mode: str = Query("any", pattern="^(any|all)$", description="Match posts with any / all of the tags"),
     ids: Optional[str] = Query(None, description="Comma-separated list of post IDs"),
     limit: Optional[int] = Query(None, ge=1, le=100, description="Maximum number of results"),
     sort: str = Query("published_at", pattern="^(published_at|created_at|title)$"),
-    order: str = Query("desc", pattern="^(asc|desc)$")
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor (next_cursor of previous page) - skips offset and total count"),
+    view: str = Query("summary", pattern="^(summary|full)$", description="'summary' omits content (use the post endpoint for full body)"),
+    include_total: bool = Query(True, description="Include total and pages (false skips counting)")
 ):
     """Pobierz wszystkie posty bloga z paginacją i filtrowaniem (wielojęzyczne)"""
     
-    # Base query - join with translations
-    query = db.query(BlogPost).options(
-        joinedload(BlogPost.translations),
-        joinedload(BlogPost.tags)
+    id_list = parse_id_list(ids)
+    tag_list = parse_tag_list(tags)
+    
+    # Serve from listing cache when the same normalized query was answered recently
+    filters = {
+        "language": language,
+        "category": category,
+        "published_only": published_only,
+        "tags": tag_list,
+        "ids": id_list
+    }
+    cache_key = listing_cache_key(
+        page=page if not limit else 1, per_page=per_page, limit=limit,
+        sort=sort, order=order, cursor=cursor, view=view, tag_mode=tag_mode,
+        include_total=include_total, **filters
     )
+    cached = blog_list_cache.get(cache_key)
+    if cached is not None:
+        result, etag, last_modified = cached
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(etag, last_modified)
+        if isinstance(result, bytes):
+            response = json_response(result)
+        set_cache_headers(response, etag, last_modified)
+        return response if isinstance(result, bytes) else result
+    
+    # A post write during the reads below must not leave this page cached
+    generation = blog_list_cache.generation
+    include_content = view == "full"
+    query = db.query(BlogPost)
     
     # Filter by publication status
     if published_only:
         query = query.filter(BlogPost.is_published == True)
     
     # Filter by specific IDs if provided
-    if ids:
-        try:
-            id_list = [int(id.strip()) for id in ids.split(',') if id.strip().isdigit()]
-            if id_list:
-                query = query.filter(BlogPost.id.in_(id_list))
-        except ValueError:
-            pass
+    if id_list:
+        query = query.filter(BlogPost.id.in_(id_list))
     
     # Filter by category
     if category:
         query = query.filter(BlogPost.category == category)
     
-    # Filter by tags
-    if tags:
-        tag_list = [tag.strip() for tag in tags.split(',') if tag.strip()]
-        if tag_list:
-            query = query.join(BlogTag).filter(BlogTag.tag_name.in_(tag_list))
+    # Filter by tags (semi-join - no duplicated posts or inflated totals)
+    if tag_list:
+        query = query.filter(tag_filter(tag_list, tag_mode))
     
-    # Order by specified field
-    if sort == "published_at":
-        if order == "desc":
-            query = query.order_by(BlogPost.published_at.desc().nullslast())
-        else:
-            query = query.order_by(BlogPost.published_at.asc().nullsfirst())
-    elif sort == "created_at":
-        if order == "desc":
-            query = query.order_by(BlogPost.created_at.desc())
-        else:
-            query = query.order_by(BlogPost.created_at.asc())
+    if language:
+        # Single language view - one indexed fetch of pre-rendered documents,
+        # posts without that translation don't count towards total or page size
+        query = query.join(BlogPostTranslation, and_(
+            BlogPostTranslation.post_id == BlogPost.id,
+            BlogPostTranslation.language_code == language
+        )).outerjoin(BlogPostDocument, and_(
+            BlogPostDocument.post_id == BlogPost.id,
+            BlogPostDocument.language_code == language
+        ))
+    
+    # Plain COUNT over the filtered posts (no eager-load joins), shared by every page of this filter set
+    count_query = query.with_entities(func.count(BlogPost.id))
+    count_key = ("list", tag_mode, *sorted(filters.items()))
+    
+    # Order by specified field (id as tie-breaker keeps keyset pagination stable)
+    sort_column = {"published_at": BlogPost.published_at, "created_at": BlogPost.created_at}.get(sort)
+    if sort_column is not None:
+        query = query.order_by(*keyset_order(sort_column, BlogPost.id, order == "desc"))
+    
+    if language:
+        query = query.with_entities(
+            BlogPost.id,
+            sort_column if sort_column is not None else BlogPost.id,
+            BlogPostDocument.full if include_content else BlogPostDocument.summary,
+            BlogPostDocument.version,
+            BlogPostDocument.source_updated_at
+        )
+    else:
+        # Multilingual view - all translations (summary view never reads the large content column)
+        translations_loader = joinedload(BlogPost.translations)
+        if not include_content:
+            translations_loader = translations_loader.defer(BlogPostTranslation.content)
+        query = query.options(translations_loader, joinedload(BlogPost.tags))
     
     # Apply limit if specified (overrides pagination)
     if limit:
-        posts = query.limit(limit).all()
-        total = len(posts)
+        rows = query.limit(limit).all()
+        total = len(rows)
+    elif cursor:
+        # Keyset pagination - range scan on (sort column, id) index, no count
+        if sort_column is None:
+            raise HTTPException(
+                status_code=400,
+                detail={"translation_code": "CURSOR_SORT_UNSUPPORTED", "message": f"Cursor pagination is not supported for sort '{sort}'"}
+            )
+        query = query.filter(cursor_filter(cursor, sort_column, order == "desc"))
+        total = None
+        rows = query.limit(per_page).all()
     else:
         # Calculate pagination
-        total = query.count()
-        posts = query.offset((page - 1) * per_page).limit(per_page).all()
+        total = cached_count(count_key, filters, count_query.scalar) if include_total else None
+        rows = query.offset((page - 1) * per_page).limit(per_page).all()
+    
+    next_cursor = None
+    if not limit and sort_column is not None and len(rows) == per_page:
+        if language:
+            next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+        else:
+            next_cursor = encode_cursor(getattr(rows[-1], sort), rows[-1].id)
+    
+    meta = {
+        "total": total,
+        "page": None if cursor and not limit else (page if not limit else 1),
+        "pages": None if total is None else ((total + per_page - 1) // per_page if not limit else 1),
+        "per_page": per_page if not limit else total,
+        "next_cursor": next_cursor
+    }
+    
+    # Comment counters of the whole page in one lookup (comment writes drop the cached pages showing the post)
+    post_ids = {row[0] if language else row.id for row in rows}
+    comment_counts = {post_id: stats[0] for post_id, stats in load_comment_stats(db, post_ids).items()}
     
-    # Convert to single language view if language specified
     if language:
-        posts_data = []
-        for post in posts:
-            # Find translation for requested language
-            translation = next(
-                (t for t in post.translations if t.language_code == language), 
-                None
-            )
-            if translation:
-                post_dict = {
-                    "id": post.id,
-                    "slug": post.slug,
-                    "title": translation.title,
-                    "content": translation.content,
-                    "excerpt": translation.excerpt,
-                    "author": post.author,
-                    "author_id": post.author_id,
-                    "meta_title": translation.meta_title,
-                    "meta_description": translation.meta_description,
-                    "language_code": translation.language_code,
-                    "category": post.category,
-                    "featured_image": post.featured_image,
-                    "created_at": post.created_at,
-                    "updated_at": post.updated_at,
-                    "is_published": post.is_published,
-                    "published_at": post.published_at,
-                    "tags": [tag.tag_name for tag in post.tags] if post.tags else []
-                }
-                posts_data.append(post_dict)
+        # Posts without a stored document yet are rendered in memory
+        missing = missing_documents(db, [row[0] for row in rows if row[2] is None], language)
+        if missing:
+            field = "full" if include_content else "summary"
+            rows = [
+                (post_id, sort_value, missing[post_id][field], missing[post_id]["version"], missing[post_id]["source_updated_at"])
+                if document is None else (post_id, sort_value, document, version, updated_at)
+                for post_id, sort_value, document, version, updated_at in rows
+            ]
+        
+        # Pre-encoded documents are spliced into the response body as-is
+        result = paginated_json((
+            with_comment_count(document, comment_counts.get(post_id, 0)) for post_id, _, document, _, _ in rows
+        ), **meta)
+        versions = [version for _, _, _, version, _ in rows]
+        last_modified = latest(*(updated_at for _, _, _, _, updated_at in rows))
     else:
-        # Return full multilingual posts
-        posts_data = []
-        for post in posts:
-            post_dict = {
-                "id": post.id,
-                "slug": post.slug,
-                "author": post.author,
-                "author_id": post.author_id,
-                "category": post.category,
-                "featured_image": post.featured_image,
-                "created_at": post.created_at,
-                "updated_at": post.updated_at,
-                "is_published": post.is_published,
-                "published_at": post.published_at,
-                "tags": [tag.tag_name for tag in post.tags] if post.tags else [],
-                "translations": [
-                    {
-                        "id": t.id,
-                        "language_code": t.language_code,
-                        "title": t.title,
-                        "content": t.content,
-                        "excerpt": t.excerpt,
-                        "meta_title": t.meta_title,
-                        "meta_description": t.meta_description,
-                        "created_at": t.created_at,
-                        "updated_at": t.updated_at
-                    } for t in post.translations
-                ]
-            }
-            posts_data.append(post_dict)
+        items = []
+        for post in rows:
+            item = serialize_post_multilingual(post, include_content)
+            item["comment_count"] = comment_counts.get(post.id, 0)
+            items.append(item)
+        result = PaginatedResponse(items=items, **meta)
+        versions = [post_version(post) for post in rows]
+        last_modified = latest(*(version_last_modified(version) for version in versions))
+    etag = make_etag("list", cache_key, total, next_cursor, versions, sorted(comment_counts.items()))
+    
+    blog_list_cache.set(cache_key, (result, etag, last_modified), meta={
+        "filters": filters,
+        "post_ids": post_ids
+    }, generation=generation)
+    
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    if language:
+        response = json_response(result)
+    set_cache_headers(response, etag, last_modified)
+    return response if language else result
+
+@router.get("/search", response_model=PaginatedResponse)
+async def search_blog_posts(
+    db: Session = Depends(get_db),
+    q: str = Query(..., min_length=1, max_length=200, description="Search phrase"),
+    language: str = Query(..., description="Language code (e.g., 'en', 'pl')"),
+    per_page: int = Query(10, ge=1, le=50),
+    cursor: Optional[str] = Query(None, description="Keyset cursor (next_cursor of previous page)")
+):
+    """Wyszukiwanie pełnotekstowe w opublikowanych postach (ranking + podświetlone fragmenty)"""
+    after = None
+    if cursor:
+        rank, last_id = decode_keyset_cursor(cursor)
+        after = (decode_number(rank), last_id)
+    
+    results = search_posts(db, q, language, per_page, after)
+    
+    # Load summary fields of the matched posts in one query
+    rows = db.query(BlogPost, BlogPostTranslation).join(
+        BlogPostTranslation, BlogPostTranslation.post_id == BlogPost.id
+    ).filter(
+        BlogPost.id.in_([post_id for post_id, _, _ in results]),
+        BlogPostTranslation.language_code == language
+    ).options(
+        defer(BlogPostTranslation.content),
+        selectinload(BlogPost.tags)
+    ).all()
+    posts = {post.id: (post, translation) for post, translation in rows}
+    
+    items = []
+    for post_id, rank, snippet in results:
+        if post_id not in posts:
+            continue
+        post, translation = posts[post_id]
+        item = serialize_post_single_language(post, translation, include_content=False)
+        item["rank"] = rank
+        item["snippet"] = snippet
+        items.append(item)
+    
+    next_cursor = None
+    if len(results) == per_page:
+        next_cursor = encode_cursor(results[-1][1], results[-1][0])
+    
+    return PaginatedResponse(items=items, per_page=per_page, next_cursor=next_cursor)
+
+@router.get("/tags", response_model=List[TagFacet])
+async def get_tag_facets(
+    db: Session = Depends(get_db),
+    min_count: int = Query(1, ge=0, description="Minimum number of published posts"),
+    limit: int = Query(100, ge=1, le=500)
+):
+    """Tagi z liczbą opublikowanych postów (licznik utrzymywany przy zapisie)"""
+    tags = db.query(Tag.tag_name, Tag.published_post_count).filter(
+        Tag.published_post_count >= min_count
+    ).order_by(Tag.published_post_count.desc(), Tag.tag_name).limit(limit).all()
     
-    return PaginatedResponse(
-        items=posts_data,
-        total=total,
-        page=page if not limit else 1,
-        pages=(total + per_page - 1) // per_page if not limit else 1,
-        per_page=per_page if not limit else total
-    )
+    return [TagFacet(tag_name=name, count=count) for name, count in tags]
 
 @router.put("/{post_id}", response_model=dict)
 async def update_blog_post(
@@ -191,6 +348,8 @@ async def update_blog_post(
             detail={"translation_code": "POST_NOT_FOUND", "message": "Post not found"}
         )
     
+    scope_before = post_scope(post)
+    
     # Update main post fields
     update_data = post_update.dict(exclude={'translations', 'tags'}, exclude_unset=True)
     for field, value in update_data.items():
@@ -242,58 +401,81 @@ async def update_blog_post(
     
     # Update tags
     if hasattr(post_update, 'tags') and post_update.tags is not None:
-        # Delete existing tags
-        db.query(BlogTag).filter(BlogTag.post_id == post_id).delete()
-        
-        # Add new tags
-        for tag_name in post_update.tags:
-            if tag_name.strip():
-                tag = BlogTag(post_id=post_id, tag_name=tag_name.strip())
-                db.add(tag)
+        post.tags = get_or_create_tags(db, post_update.tags)
+        # Legacy rows would otherwise bring removed tags back on migration
+        db.query(BlogTag).filter(BlogTag.post_id == post_id).delete(synchronize_session=False)
     
     post.updated_at = datetime.now(timezone.utc)
+    refresh_tag_counts(db, scope_before["tags"] | {tag.tag_name for tag in post.tags})
+    render_post_documents(db, post_id)
     db.commit()
     db.refresh(post)
+    invalidate_post(scope_before, post_scope(post))
     
     # Return updated post with translations
-    return {
-        "id": post.id,
-        "slug": post.slug,
-        "author": post.author,
-        "author_id": post.author_id,
-        "category": post.category,
-        "featured_image": post.featured_image,
-        "created_at": post.created_at,
-        "updated_at": post.updated_at,
-        "is_published": post.is_published,
-        "published_at": post.published_at,
-        "tags": [tag.tag_name for tag in post.tags] if post.tags else [],
-        "translations": [
-            {
-                "id": t.id,
-                "language_code": t.language_code,
-                "title": t.title,
-                "content": t.content,
-                "excerpt": t.excerpt,
-                "meta_title": t.meta_title,
-                "meta_description": t.meta_description,
-                "created_at": t.created_at,
-                "updated_at": t.updated_at
-            } for t in post.translations
-        ]
-    }
+    return serialize_post_multilingual(post)
 
 @router.get("/{slug}", response_model=dict)
 async def get_blog_post_by_slug(
     slug: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     language: Optional[str] = Query(None, description="Language code")
 ):
     """Pobierz pojedynczy post po slug"""
-    post = db.query(BlogPost).options(
-        joinedload(BlogPost.translations),
-        joinedload(BlogPost.tags)
-    ).filter(BlogPost.slug == slug).first()
+    if language:
+        # Pre-rendered document - validators and body in one indexed lookup
+        document = db.query(
+            BlogPostDocument.full, BlogPostDocument.version, BlogPostDocument.source_updated_at
+        ).join(BlogPost, BlogPost.id == BlogPostDocument.post_id).filter(
+            BlogPost.slug == slug,
+            BlogPostDocument.language_code == language
+        ).first()
+        if document is not None:
+            body, etag, last_modified = document
+            if is_not_modified(request, etag, last_modified):
+                return not_modified(etag, last_modified)
+            response = json_response(body.encode())
+            set_cache_headers(response, etag, last_modified)
+            return response
+    
+    # Cheap version lookup first - answers 304 without loading the post body
+    version = query_post_version(db, slug, language)
+    if version is None:
+        raise HTTPException(
+            status_code=404, 
+            detail={"translation_code": "POST_NOT_FOUND", "message": "Post not found"}
+        )
+    
+    if language and not version[2]:
+        raise HTTPException(
+            status_code=404, 
+            detail={"translation_code": "TRANSLATION_NOT_FOUND", "message": f"Translation for language '{language}' not found"}
+        )
+    
+    etag = make_etag("post", language, version)
+    last_modified = version_last_modified(version)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    
+    if language:
+        # Outer join keeps the post row so a missing translation is reported separately
+        post = db.query(BlogPost).outerjoin(
+            BlogPostTranslation,
+            and_(
+                BlogPostTranslation.post_id == BlogPost.id,
+                BlogPostTranslation.language_code == language
+            )
+        ).options(
+            contains_eager(BlogPost.translations),
+            joinedload(BlogPost.tags)
+        ).filter(BlogPost.slug == slug).first()
+    else:
+        post = db.query(BlogPost).options(
+            joinedload(BlogPost.translations),
+            joinedload(BlogPost.tags)
+        ).filter(BlogPost.slug == slug).first()
     
     if not post:
         raise HTTPException(
@@ -301,6 +483,10 @@ async def get_blog_post_by_slug(
             detail={"translation_code": "POST_NOT_FOUND", "message": "Post not found"}
         )
     
+    # Validators come from the loaded rows, in case the post changed after the version lookup
+    version = post_version(post)
+    set_cache_headers(response, make_etag("post", language, version), version_last_modified(version))
+    
     if language:
         # Return single language version
         translation = next(
@@ -313,53 +499,10 @@ async def get_blog_post_by_slug(
                 detail={"translation_code": "TRANSLATION_NOT_FOUND", "message": f"Translation for language '{language}' not found"}
             )
         
-        return {
-            "id": post.id,
-            "slug": post.slug,
-            "title": translation.title,
-            "content": translation.content,
-            "excerpt": translation.excerpt,
-            "author": post.author,
-            "author_id": post.author_id,
-            "meta_title": translation.meta_title,
-            "meta_description": translation.meta_description,
-            "language_code": translation.language_code,
-            "category": post.category,
-            "featured_image": post.featured_image,
-            "created_at": post.created_at,
-            "updated_at": post.updated_at,
-            "is_published": post.is_published,
-            "published_at": post.published_at,
-            "tags": [tag.tag_name for tag in post.tags] if post.tags else []
-        }
+        return serialize_post_single_language(post, translation)
     else:
         # Return full multilingual post
-        return {
-            "id": post.id,
-            "slug": post.slug,
-            "author": post.author,
-            "author_id": post.author_id,
-            "category": post.category,
-            "featured_image": post.featured_image,
-            "created_at": post.created_at,
-            "updated_at": post.updated_at,
-            "is_published": post.is_published,
-            "published_at": post.published_at,
-            "tags": [tag.tag_name for tag in post.tags] if post.tags else [],
-            "translations": [
-                {
-                    "id": t.id,
-                    "language_code": t.language_code,
-                    "title": t.title,
-                    "content": t.content,
-                    "excerpt": t.excerpt,
-                    "meta_title": t.meta_title,
-                    "meta_description": t.meta_description,
-                    "created_at": t.created_at,
-                    "updated_at": t.updated_at
-                } for t in post.translations
-            ]
-        }
+        return serialize_post_multilingual(post)
 
 @router.post("/", response_model=BlogPostPublic)
 async def create_blog_post(
@@ -411,12 +554,13 @@ async def create_blog_post(
     
     # Add tags
     if post.tags:
-        for tag_name in post.tags:
-            tag = BlogTag(post_id=db_post.id, tag_name=tag_name.strip())
-            db.add(tag)
+        db_post.tags = get_or_create_tags(db, post.tags)
     
+    refresh_tag_counts(db, [tag.tag_name for tag in db_post.tags])
+    render_post_documents(db, db_post.id)
     db.commit()
     db.refresh(db_post)
+    invalidate_post(post_scope(db_post))
     
     return db_post
 
@@ -429,14 +573,15 @@ async def get_admin_blog_posts(
     per_page: int = Query(10, ge=1, le=100),
     status: str = Query("all", pattern="^(all|published|draft)$"),
     category: Optional[str] = Query(None),
-    published_only: Optional[bool] = Query(None, description="Legacy parameter")
+    published_only: Optional[bool] = Query(None, description="Legacy parameter"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor (next_cursor of previous page) - skips offset and total count"),
+    view: str = Query("summary", pattern="^(summary|full)$", description="'summary' omits content (use the post endpoint for full body)"),
+    include_total: bool = Query(True, description="Include total and pages (false skips counting)")
 ):
     """Admin endpoint: Pobierz wszystkie posty (w tym nieopublikowane)"""
     
-    query = db.query(BlogPost).options(
-        joinedload(BlogPost.translations),
-        joinedload(BlogPost.tags)
-    )
+    include_content = view == "full"
+    query = db.query(BlogPost)
     
     # Filter by category
     if category:
@@ -452,50 +597,49 @@ async def get_admin_blog_posts(
         query = query.filter(BlogPost.is_published == published_only)
     # If status="all" or no filter, show all posts
     
-    # Order by creation date (newest first), then by published date
-    query = query.order_by(BlogPost.created_at.desc(), BlogPost.published_at.desc())
+    count_query = query.with_entities(func.count(BlogPost.id))
+    count_filters = {
+        "language": None,
+        "category": category,
+        "published_only": status == "published" or (status == "all" and published_only is True),
+        "tags": (),
+        "ids": ()
+    }
+    
+    translations_loader = joinedload(BlogPost.translations)
+    if not include_content:
+        translations_loader = translations_loader.defer(BlogPostTranslation.content)
+    query = query.options(translations_loader, joinedload(BlogPost.tags))
     
-    # Calculate pagination
-    total = query.count()
-    posts = query.offset((page - 1) * per_page).limit(per_page).all()
+    # Order by creation date (newest first), id as tie-breaker for keyset pagination
+    query = query.order_by(*keyset_order(BlogPost.created_at, BlogPost.id, True))
+    
+    if cursor:
+        # Keyset pagination - range scan on (created_at, id) index, no count
+        query = query.filter(cursor_filter(cursor, BlogPost.created_at, True))
+        total = None
+        posts = query.limit(per_page).all()
+    else:
+        # Calculate pagination
+        total = cached_count(
+            ("admin", status, category, published_only), count_filters, count_query.scalar
+        ) if include_total else None
+        posts = query.offset((page - 1) * per_page).limit(per_page).all()
+    
+    next_cursor = None
+    if len(posts) == per_page:
+        next_cursor = encode_cursor(posts[-1].created_at, posts[-1].id)
     
     # Convert posts to response format with admin details
-    posts_data = []
-    for post in posts:
-        post_dict = {
-            "id": post.id,
-            "slug": post.slug,
-            "author": post.author,
-            "author_id": post.author_id,
-            "category": post.category,
-            "featured_image": post.featured_image,
-            "created_at": post.created_at,
-            "updated_at": post.updated_at,
-            "is_published": post.is_published,
-            "published_at": post.published_at,
-            "tags": [tag.tag_name for tag in post.tags] if post.tags else [],
-            "translations": [
-                {
-                    "id": t.id,
-                    "language_code": t.language_code,
-                    "title": t.title,
-                    "content": t.content,
-                    "excerpt": t.excerpt,
-                    "meta_title": t.meta_title,
-                    "meta_description": t.meta_description,
-                    "created_at": t.created_at,
-                    "updated_at": t.updated_at
-                } for t in post.translations
-            ]
-        }
-        posts_data.append(post_dict)
+    posts_data = [serialize_post_multilingual(post, include_content) for post in posts]
     
     return PaginatedResponse(
         items=posts_data,
         total=total,
-        page=page,
-        pages=(total + per_page - 1) // per_page,
-        per_page=per_page
+        page=None if cursor else page,
+        pages=None if total is None else (total + per_page - 1) // per_page,
+        per_page=per_page,
+        next_cursor=next_cursor
     )
 
 @router.put("/{post_id}/publish", response_model=APIResponse)
@@ -513,9 +657,13 @@ async def publish_blog_post(
             detail={"translation_code": "POST_NOT_FOUND", "message": "Post not found"}
         )
     
+    scope_before = post_scope(post)
     post.is_published = True
     post.published_at = datetime.now(timezone.utc)
+    refresh_tag_counts(db, scope_before["tags"])
+    render_post_documents(db, post_id)
     db.commit()
+    invalidate_post(scope_before, post_scope(post))
 
     return APIResponse(success=True,type="success",translation_code="POST_PUBLISHED", message="Post published successfully")
 
@@ -534,9 +682,13 @@ async def unpublish_blog_post(
             detail={"translation_code": "POST_NOT_FOUND", "message": "Post not found"}
         )
     
+    scope_before = post_scope(post)
     post.is_published = False
     post.published_at = None
+    refresh_tag_counts(db, scope_before["tags"])
+    render_post_documents(db, post_id)
     db.commit()
+    invalidate_post(scope_before, post_scope(post))
 
     return APIResponse(success=True, type="success", translation_code="POST_UNPUBLISHED", message="Post unpublished successfully")
 
@@ -589,20 +741,12 @@ async def add_translation(
     )
     
     db.add(db_translation)
+    render_post_documents(db, post_id)
     db.commit()
     db.refresh(db_translation)
+    invalidate_post(post_scope(post))
     
-    return {
-        "id": db_translation.id,
-        "language_code": db_translation.language_code,
-        "title": db_translation.title,
-        "content": db_translation.content,
-        "excerpt": db_translation.excerpt,
-        "meta_title": db_translation.meta_title,
-        "meta_description": db_translation.meta_description,
-        "created_at": db_translation.created_at,
-        "updated_at": db_translation.updated_at
-    }
+    return serialize_translation(db_translation)
 
 @router.put("/{post_id}/translations/{language_code}", response_model=dict)
 async def update_translation(
@@ -631,20 +775,12 @@ async def update_translation(
         setattr(translation, field, value)
     
     translation.updated_at = datetime.now(timezone.utc)
+    render_post_documents(db, post_id)
     db.commit()
     db.refresh(translation)
+    invalidate_post(post_scope(translation.post))
     
-    return {
-        "id": translation.id,
-        "language_code": translation.language_code,
-        "title": translation.title,
-        "content": translation.content,
-        "excerpt": translation.excerpt,
-        "meta_title": translation.meta_title,
-        "meta_description": translation.meta_description,
-        "created_at": translation.created_at,
-        "updated_at": translation.updated_at
-    }
+    return serialize_translation(translation)
 
 @router.delete("/{post_id}/translations/{language_code}", response_model=APIResponse)
 async def delete_translation(
@@ -677,8 +813,12 @@ async def delete_translation(
             detail={"translation_code": "LAST_TRANSLATION", "message": "Cannot delete the last translation. A post must have at least one translation."}
         )
     
+    post = translation.post
+    scope_before = post_scope(post)
     db.delete(translation)
+    render_post_documents(db, post_id)
     db.commit()
+    invalidate_post(scope_before, post_scope(post))
 
     return APIResponse(success=True, type="success", translation_code="TRANSLATION_DELETED", message="Translation deleted successfully")
 
@@ -698,14 +838,20 @@ async def delete_blog_post(
             detail={"translation_code": "POST_NOT_FOUND", "message": "Post not found"}
         )
     
-    # Delete related tags
-    db.query(BlogTag).filter(BlogTag.post_id == post_id).delete()
+    scope_before = post_scope(post)
+    db.expire(post, ["tags", "translations"])  # Collections are bulk-deleted below
+    
+    # Delete tag associations
+    db.execute(blog_post_tags.delete().where(blog_post_tags.c.post_id == post_id))
+    db.query(BlogTag).filter(BlogTag.post_id == post_id).delete()  # Legacy rows (FK without cascade)
     
     # Delete translations (cascade should handle this, but being explicit)
     db.query(BlogPostTranslation).filter(BlogPostTranslation.post_id == post_id).delete()
     
     # Delete post
     db.delete(post)
+    refresh_tag_counts(db, scope_before["tags"])
     db.commit()
+    invalidate_post(scope_before)
 
     return APIResponse(success=True, type="success", translation_code="POST_DELETED", message="Post deleted successfully")
@@ -1,20 +1,44 @@
 """
 Comments router for blog posts
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, delete, insert, literal, literal_column, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from typing import List, Optional
 from datetime import datetime, timedelta, timezone
 
 from ..database import get_db
-from ..models import Comment, CommentLike, BlogPost, User, UserRoleEnum
+from ..models import Comment, CommentLike, BlogPost, BlogPostCommentStats, User, UserRole, UserRank, UserRoleEnum, comment_hot_score
 from ..schemas import CommentCreate, CommentUpdate, CommentLikeCreate, Comment as CommentSchema, CommentWithReplies, APIResponse, PaginatedResponse
-from ..security import get_current_user, get_current_user_optional
-from ..rank_utils import update_user_stats
+from ..security import get_current_user, get_current_user_optional, get_current_principal
+from ..identity_cache import UserSnapshot
+from ..search import is_postgres
+from ..rank_utils import user_stats_buffer
+from ..comment_cache import cached_comment_count, invalidate_comment_counts, comment_thread_cache, invalidate_comment_thread, author_metadata_cache
+from ..comment_stats import adjust_post_comment_stats, comment_stats_response
+from ..blog_cache import parse_id_list, invalidate_post_listings
+from ..events import comment_events, format_event, CLOSED, COMMENT_STREAM_HEARTBEAT
+from ..pagination import encode_cursor, decode_keyset_cursor, decode_datetime, decode_number, keyset_order, keyset_after
 
 router = APIRouter()
 
+TOTAL_COUNT_HEADER = "X-Total-Count"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_STATS_POST_IDS = 100  # Post IDs per bulk stats request
+
+# sort parameter -> maintained column backed by an ix_comments_thread_* index
+COMMENT_SORT_COLUMNS = {
+    "created_at": Comment.created_at,
+    "likes": Comment.likes_count,
+    "score": Comment.score,
+    "hot": Comment.hot_score,
+}
+
 def make_timezone_aware(dt):
     """Convert naive datetime to UTC timezone-aware datetime"""
     if dt is None:
@@ -30,64 +54,176 @@ def get_client_ip(request: Request) -> str:
         return x_forwarded_for.split(',')[0].strip()
     return request.client.host
 
-def build_comment_response(comment: Comment, current_user: Optional[User] = None, include_replies: bool = False) -> dict:
-    """Build comment response with like counts and user like status"""
-    
-    # Count likes and dislikes
-    likes_count = len([like for like in comment.likes if like.is_like])
-    dislikes_count = len([like for like in comment.likes if not like.is_like])
-    
-    # Get user's like status
-    user_like_status = None
-    if current_user:
-        user_like = next((like for like in comment.likes if like.user_id == current_user.id), None)
-        if user_like:
-            user_like_status = user_like.is_like
-    
-    # Count replies
-    replies_count = len([reply for reply in comment.replies if not reply.is_deleted])
-    
-    # Check permissions for current user
-    can_edit = False
-    can_delete = False
-    
-    if current_user and not comment.is_deleted:
-        # can_edit: tylko właściciel + czas < 15 min
-        if comment.user_id == current_user.id:
-            # Ensure both datetimes are timezone-aware for comparison
-            current_time = datetime.now(timezone.utc)
-            created_at = make_timezone_aware(comment.created_at)
-            time_since_creation = current_time - created_at
-            if time_since_creation <= timedelta(minutes=15):
-                can_edit = True
+def load_viewer_likes(db: Session, current_user: Optional[User], comments_data: List[dict]) -> dict:
+    """
+    Viewer state for a page of comments: {comment_id: is_like} of the viewer's own votes
+    One indexed query on (user_id, comment_id) for the whole page, replies included.
+    """
+    if not current_user or not comments_data:
+        return {}
+    
+    comment_ids = set()
+    for comment_data in comments_data:
+        comment_ids.add(comment_data["id"])
+        comment_ids.update(reply["id"] for reply in comment_data.get("replies", ()))
+    
+    return dict(db.query(CommentLike.comment_id, CommentLike.is_like).filter(
+        CommentLike.user_id == current_user.id,
+        CommentLike.comment_id.in_(comment_ids)
+    ).all())
+
+def adjust_like_counters(db: Session, comment_id: int, old_is_like: Optional[bool], new_is_like: Optional[bool]) -> None:
+    """Atomically move the comment's like/dislike counters from old to new vote (None = no vote)"""
+    likes_delta = int(new_is_like is True) - int(old_is_like is True)
+    dislikes_delta = int(new_is_like is False) - int(old_is_like is False)
+    if likes_delta or dislikes_delta:
+        db.query(Comment).filter(Comment.id == comment_id).update({
+            Comment.likes_count: Comment.likes_count + likes_delta,
+            Comment.dislikes_count: Comment.dislikes_count + dislikes_delta,
+            Comment.score: Comment.score + likes_delta - dislikes_delta,
+            Comment.updated_at: Comment.updated_at  # Counters are not an edit - keep onupdate off
+        }, synchronize_session=False)
         
-        # can_delete: właściciel/moderator/admin
-        if comment.user_id == current_user.id:
-            can_delete = True
-        elif current_user.role and current_user.role.name == UserRoleEnum.ADMIN:
-            can_delete = True
-        elif current_user.role and current_user.role.name == UserRoleEnum.MODERATOR:
-            can_delete = True
+        # Row is locked by the update above - recompute hot score from the new score
+        score, created_at = db.query(Comment.score, Comment.created_at).filter(Comment.id == comment_id).one()
+        update_hot_score(db, comment_id, score, created_at)
+
+def update_hot_score(db: Session, comment_id: int, score: int, created_at: datetime) -> None:
+    db.query(Comment).filter(Comment.id == comment_id).update(
+        {Comment.hot_score: comment_hot_score(score, created_at), Comment.updated_at: Comment.updated_at},
+        synchronize_session=False
+    )
+
+def toggle_like_upsert(db: Session, comment_id: int, user_id: int, is_like: bool) -> tuple:
+    """
+    Toggle a vote in one statement (PostgreSQL): delete the same vote, otherwise upsert the new one,
+    and move the counters by the rows actually changed. Concurrent toggles cannot hit uq_comment_user_like.
+    Returns (action, likes_count, dislikes_count, score).
+    """
+    likes = CommentLike.__table__
+    comments = Comment.__table__
+    liked, disliked = int(is_like), int(not is_like)
+    
+    deleted = delete(likes).where(
+        likes.c.comment_id == comment_id,
+        likes.c.user_id == user_id,
+        likes.c.is_like == is_like
+    ).returning(likes.c.id).cte("deleted")
+    
+    insert_vote = pg_insert(likes).from_select(
+        ["comment_id", "user_id", "is_like"],
+        select(literal(comment_id), literal(user_id), literal(is_like)).where(~select(deleted.c.id).exists())
+    )
+    upserted = insert_vote.on_conflict_do_update(
+        constraint="uq_comment_user_like",
+        set_={"is_like": insert_vote.excluded.is_like, "updated_at": func.now()},
+        where=likes.c.is_like != insert_vote.excluded.is_like
+    ).returning(literal_column("xmax = 0").label("inserted")).cte("upserted")
+    
+    removed = select(func.count()).select_from(deleted).scalar_subquery()
+    added = select(func.count()).select_from(upserted).where(upserted.c.inserted).scalar_subquery()
+    flipped = select(func.count()).select_from(upserted).where(~upserted.c.inserted).scalar_subquery()
+    likes_delta = liked * added + (liked - disliked) * flipped - liked * removed
+    dislikes_delta = disliked * added + (disliked - liked) * flipped - disliked * removed
+    
+    row = db.execute(
+        update(comments).where(comments.c.id == comment_id).values(
+            likes_count=comments.c.likes_count + likes_delta,
+            dislikes_count=comments.c.dislikes_count + dislikes_delta,
+            score=comments.c.score + likes_delta - dislikes_delta,
+            updated_at=comments.c.updated_at
+        ).returning(
+            comments.c.likes_count, comments.c.dislikes_count, comments.c.score, comments.c.created_at,
+            removed.label("removed"), added.label("added"), flipped.label("flipped")
+        ).add_cte(deleted).add_cte(upserted)
+    ).one()
+    
+    if not (row.removed or row.added or row.flipped):
+        # A concurrent request of the same user already stored this vote
+        return "unchanged", row.likes_count, row.dislikes_count, row.score
+    update_hot_score(db, comment_id, row.score, row.created_at)
+    action = "removed" if row.removed else ("added" if row.added else "updated")
+    return action, row.likes_count, row.dislikes_count, row.score
+
+def toggle_like_portable(db: Session, comment_id: int, user_id: int, is_like: bool) -> tuple:
+    """Toggle a vote with a read and a write (SQLite - writers are serialized by the database lock)"""
+    existing_like = db.query(CommentLike).filter(
+        CommentLike.comment_id == comment_id,
+        CommentLike.user_id == user_id
+    ).first()
+    
+    if existing_like is None:
+        db.add(CommentLike(comment_id=comment_id, user_id=user_id, is_like=is_like))
+        adjust_like_counters(db, comment_id, None, is_like)
+        action = "added"
+    elif existing_like.is_like == is_like:
+        adjust_like_counters(db, comment_id, existing_like.is_like, None)
+        db.delete(existing_like)
+        action = "removed"
+    else:
+        adjust_like_counters(db, comment_id, existing_like.is_like, is_like)
+        existing_like.is_like = is_like
+        action = "updated"
+    
+    db.flush()
+    likes_count, dislikes_count, score = db.query(
+        Comment.likes_count, Comment.dislikes_count, Comment.score
+    ).filter(Comment.id == comment_id).one()
+    return action, likes_count, dislikes_count, score
+
+def serialize_role(role: Optional[UserRole]) -> Optional[dict]:
+    if not role:
+        return None
+    return {
+        "id": role.id,
+        "name": role.name,
+        "display_name": role.display_name,
+        "color": role.color,
+        "level": role.level,
+    }
+
+def serialize_rank(rank: Optional[UserRank]) -> Optional[dict]:
+    if not rank:
+        return None
+    return {
+        "id": rank.id,
+        "name": rank.name,
+        "display_name": rank.display_name,
+        "color": rank.color,
+        "level": rank.level,
+        "icon": rank.icon
+    }
+
+def author_metadata(db: Session) -> tuple:
+    """({role_id: role}, {rank_id: rank}) as serialized in comment authors - cached, they change only via admin scripts"""
+    metadata = author_metadata_cache.get("author")
+    if metadata is None:
+        metadata = (
+            {role.id: serialize_role(role) for role in db.query(UserRole)},
+            {rank.id: serialize_rank(rank) for rank in db.query(UserRank)}
+        )
+        author_metadata_cache.set("author", metadata)
+    return metadata
+
+def comment_author_info(db: Session, user: User) -> dict:
+    """Author of a comment from the user's columns and cached role / rank metadata (no relationship loads)"""
+    roles, ranks = author_metadata(db)
+    return {
+        "id": user.id,
+        "username": user.username,
+        "role": roles.get(user.role_id),
+        "rank": ranks.get(user.rank_id)
+    }
+
+def build_comment_base(comment: Comment, include_replies: bool = False, author: Optional[dict] = None) -> dict:
+    """Viewer-independent part of the comment response (safe to cache and share between users)"""
     
     # Build author info with role and rank
-    author_info = {
+    author_info = author or {
         "id": comment.user.id if comment.user else None,
         "username": comment.user.username if comment.user else "Usunięty użytkownik",
-        "role": {
-            "id": comment.user.role.id if comment.user and comment.user.role else None,
-            "name": comment.user.role.name if comment.user and comment.user.role else None,
-            "display_name": comment.user.role.display_name if comment.user and comment.user.role else None,
-            "color": comment.user.role.color if comment.user and comment.user.role else None,
-            "level": comment.user.role.level if comment.user and comment.user.role else 0,
-        } if comment.user and comment.user.role else None,
-        "rank": {
-            "id": comment.user.rank.id if comment.user and comment.user.rank else None,
-            "name": comment.user.rank.name if comment.user and comment.user.rank else None,
-            "display_name": comment.user.rank.display_name if comment.user and comment.user.rank else None,
-            "color": comment.user.rank.color if comment.user and comment.user.rank else None,
-            "level": comment.user.rank.level if comment.user and comment.user.rank else 0,
-            "icon": comment.user.rank.icon if comment.user and comment.user.rank else None
-        } if comment.user and comment.user.rank else None
+        "role": serialize_role(comment.user.role) if comment.user else None,
+        "rank": serialize_rank(comment.user.rank) if comment.user else None
     }
     
     comment_data = {
@@ -100,32 +236,169 @@ def build_comment_response(comment: Comment, current_user: Optional[User] = None
         "author": author_info,
         "created_at": comment.created_at,
         "updated_at": comment.updated_at,
-        "likes_count": likes_count,
-        "dislikes_count": dislikes_count,
-        "user_like_status": user_like_status,
-        "replies_count": replies_count,
-        "can_edit": can_edit,
-        "can_delete": can_delete
+        # Counters are maintained on the comment row
+        "likes_count": comment.likes_count or 0,
+        "dislikes_count": comment.dislikes_count or 0,
+        "user_like_status": None,
+        "replies_count": comment.replies_count or 0,
+        "can_edit": False,
+        "can_delete": False
     }
     
     if include_replies:
-        comment_data["replies"] = [
-            build_comment_response(reply, current_user, False) 
-            for reply in comment.replies 
-        ]
+        comment_data["replies"] = [build_comment_base(reply) for reply in comment.replies]
     
     return comment_data
 
+def apply_viewer_state(comment_data: dict, current_user: Optional[User], viewer_likes: dict) -> dict:
+    """Copy of a base comment response with the viewer's like status and permissions filled in"""
+    result = dict(comment_data)
+    
+    if "replies" in comment_data:
+        result["replies"] = [apply_viewer_state(reply, current_user, viewer_likes) for reply in comment_data["replies"]]
+    
+    if not current_user:
+        return result
+    
+    # Get user's like status (from load_viewer_likes - like rows are never loaded)
+    result["user_like_status"] = viewer_likes.get(comment_data["id"])
+    
+    # Check permissions for current user
+    if not comment_data["is_deleted"]:
+        # can_edit: tylko właściciel + czas < 15 min
+        if comment_data["user_id"] == current_user.id:
+            # Ensure both datetimes are timezone-aware for comparison
+            current_time = datetime.now(timezone.utc)
+            created_at = make_timezone_aware(comment_data["created_at"])
+            time_since_creation = current_time - created_at
+            if time_since_creation <= timedelta(minutes=15):
+                result["can_edit"] = True
+        
+        # can_delete: właściciel/moderator/admin
+        if comment_data["user_id"] == current_user.id:
+            result["can_delete"] = True
+        elif current_user.role and current_user.role.name == UserRoleEnum.ADMIN:
+            result["can_delete"] = True
+        elif current_user.role and current_user.role.name == UserRoleEnum.MODERATOR:
+            result["can_delete"] = True
+    
+    return result
+
+def build_comment_response(comment: Comment, current_user: Optional[User] = None, include_replies: bool = False,
+                           viewer_likes: Optional[dict] = None) -> dict:
+    """Build comment response with like counts and user like status"""
+    return apply_viewer_state(build_comment_base(comment, include_replies), current_user, viewer_likes or {})
+
+def reply_cursor(reply: Comment) -> str:
+    """Cursor for get_comment_replies continuing after `reply`"""
+    return encode_cursor(reply.created_at, reply.id)
+
+def load_reply_previews(db: Session, post_id: int, parent_ids: List[int], limit: int) -> dict:
+    """
+    First `limit` replies of each parent in one ROW_NUMBER() OVER (PARTITION BY parent_id) query
+    Returns {parent_id: (replies, next cursor or None)}.
+    """
+    if not parent_ids:
+        return {}
+    
+    # One extra row per parent tells whether more replies exist
+    ranked = db.query(
+        Comment.id,
+        func.row_number().over(
+            partition_by=Comment.parent_id,
+            order_by=(Comment.created_at.asc(), Comment.id.asc())
+        ).label("position")
+    ).filter(
+        Comment.post_id == post_id,
+        Comment.parent_id.in_(parent_ids)
+    ).subquery()
+    
+    replies = db.query(Comment).join(ranked, ranked.c.id == Comment.id).options(
+        joinedload(Comment.user).joinedload(User.role),
+        joinedload(Comment.user).joinedload(User.rank)
+    ).filter(
+        ranked.c.position <= limit + 1
+    ).order_by(Comment.parent_id, ranked.c.position).all()
+    
+    grouped = {}
+    for reply in replies:
+        grouped.setdefault(reply.parent_id, []).append(reply)
+    
+    previews = {}
+    for parent_id, parent_replies in grouped.items():
+        shown = parent_replies[:limit]
+        has_more = len(parent_replies) > limit
+        previews[parent_id] = (shown, reply_cursor(shown[-1]) if has_more else None)
+    return previews
+
+def load_comment_page(db: Session, post_id: int, sort: str, order: str, page: int,
+                      cursor: Optional[str], per_page: int, include_replies: bool,
+                      replies_preview: Optional[int] = None) -> tuple:
+    """Viewer-independent page of top-level comments: (list of base responses, next cursor)"""
+    
+    # Base query - only top-level comments (no parent)
+    # Eager load user with role and rank to avoid N+1 queries
+    loaders = [
+        joinedload(Comment.user).joinedload(User.role),
+        joinedload(Comment.user).joinedload(User.rank)
+    ]
+    if include_replies and replies_preview is None:
+        loaders += [
+            joinedload(Comment.replies).joinedload(Comment.user).joinedload(User.role),
+            joinedload(Comment.replies).joinedload(Comment.user).joinedload(User.rank)
+        ]
+    query = db.query(Comment).options(*loaders).filter(
+        Comment.post_id == post_id,
+        Comment.parent_id.is_(None)
+    )
+    
+    # Sorting - maintained column + id tie-breaker, served by the thread indexes
+    sort_column = COMMENT_SORT_COLUMNS[sort]
+    descending = order == "desc"
+    query = query.order_by(*keyset_order(sort_column, Comment.id, descending, nullable=False))
+    
+    if cursor:
+        # Keyset pagination - constant cost however deep the page is
+        value, last_id = decode_keyset_cursor(cursor)
+        value = decode_datetime(value) if sort == "created_at" else decode_number(value)
+        query = query.filter(keyset_after(sort_column, Comment.id, value, last_id, descending, nullable=False))
+        comments = query.limit(per_page).all()
+    else:
+        comments = query.offset((page - 1) * per_page).limit(per_page).all()
+    
+    next_cursor = None
+    if len(comments) == per_page:
+        last = comments[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), last.id)
+    
+    if replies_preview is None:
+        return [build_comment_base(comment, include_replies) for comment in comments], next_cursor
+    
+    # Bounded replies - at most `replies_preview` per comment, the rest via get_comment_replies
+    previews = load_reply_previews(db, post_id, [comment.id for comment in comments], replies_preview)
+    comments_data = []
+    for comment in comments:
+        replies, replies_cursor = previews.get(comment.id, ([], None))
+        comment_data = build_comment_base(comment)
+        comment_data["replies"] = [build_comment_base(reply) for reply in replies]
+        comment_data["replies_next_cursor"] = replies_cursor
+        comments_data.append(comment_data)
+    return comments_data, next_cursor
+
 @router.get("/post/{post_id}", response_model=List[dict])
 async def get_post_comments(
     post_id: int,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_user_optional),
+    current_user: Optional[UserSnapshot] = Depends(get_current_user_optional),
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
-    sort: str = Query("created_at", pattern="^(created_at|likes)$"),
+    sort: str = Query("created_at", pattern="^(created_at|likes|score|hot)$", description="likes, score (likes - dislikes) or hot (time-decayed score)"),
     order: str = Query("asc", pattern="^(asc|desc)$"),
-    include_replies: bool = Query(True, description="Include replies in response")
+    cursor: Optional[str] = Query(None, description="Keyset cursor (X-Next-Cursor of previous page) - skips offset"),
+    include_replies: bool = Query(True, description="Include replies in response"),
+    replies_preview: Optional[int] = Query(None, ge=1, le=50, description="Load at most N replies per comment (replies_next_cursor continues in /replies)"),
+    include_total: bool = Query(True, description="Return total in X-Total-Count header (false skips counting)")
 ):
     """Pobierz komentarze dla posta"""
     
@@ -137,49 +410,84 @@ async def get_post_comments(
             detail={"translation_code": "POST_NOT_FOUND", "message": "Post not found"}
         )
     
-    # Base query - only top-level comments (no parent)
-    # Eager load user with role and rank to avoid N+1 queries
-    query = db.query(Comment).options(
-        joinedload(Comment.user).joinedload(User.role),
-        joinedload(Comment.user).joinedload(User.rank),
-        joinedload(Comment.likes),
-        joinedload(Comment.replies).joinedload(Comment.user).joinedload(User.role),
-        joinedload(Comment.replies).joinedload(Comment.user).joinedload(User.rank)
-    ).filter(
-        Comment.post_id == post_id,
-        Comment.parent_id.is_(None)
-    )
-    
-    # Sorting
-    if sort == "created_at":
-        if order == "desc":
-            query = query.order_by(Comment.created_at.desc())
-        else:
-            query = query.order_by(Comment.created_at.asc())
-    elif sort == "likes":
-        # Sort by like count (likes - dislikes)
-        if order == "desc":
-            query = query.outerjoin(CommentLike).group_by(Comment.id).order_by(
-                func.sum(func.case([(CommentLike.is_like == True, 1)], else_=0)).desc(),
-                Comment.created_at.desc()
-            )
-        else:
-            query = query.outerjoin(CommentLike).group_by(Comment.id).order_by(
-                func.sum(func.case([(CommentLike.is_like == True, 1)], else_=0)).asc(),
-                Comment.created_at.asc()
-            )
+    # Pagination total (cached and counted without the eager-load joins)
+    if include_total:
+        total = cached_comment_count(("post", post_id), db.query(func.count(Comment.id)).filter(
+            Comment.post_id == post_id,
+            Comment.parent_id.is_(None)
+        ).scalar)
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
+    
+    # Viewer-independent page is shared by all users, viewer state is overlaid below
+    cache_key = ("thread", post_id, sort, order, page, cursor, per_page, include_replies, replies_preview)
+    cached = comment_thread_cache.get(cache_key)
+    if cached is None:
+        generation = comment_thread_cache.generation
+        cached = load_comment_page(db, post_id, sort, order, page, cursor, per_page, include_replies, replies_preview)
+        comment_thread_cache.set(cache_key, cached, generation=generation)
+    comments_data, next_cursor = cached
+    
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    
+    viewer_likes = load_viewer_likes(db, current_user, comments_data)
+    return [apply_viewer_state(comment_data, current_user, viewer_likes) for comment_data in comments_data]
+
+@router.get("/post/{post_id}/stream")
+async def stream_post_comments(
+    post_id: int,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """Strumień zmian komentarzy posta (Server-Sent Events: created, edited, deleted, likes)"""
     
-    # Pagination
-    total = query.count()
-    comments = query.offset((page - 1) * per_page).limit(per_page).all()
+    post_exists = db.query(BlogPost.id).filter(BlogPost.id == post_id).first()
+    # The stream may stay open for hours - don't hold a pooled connection for it
+    db.close()
+    if not post_exists:
+        raise HTTPException(
+            status_code=404, 
+            detail={"translation_code": "POST_NOT_FOUND", "message": "Post not found"}
+        )
     
-    # Build response
-    comments_data = [
-        build_comment_response(comment, current_user, include_replies)
-        for comment in comments
-    ]
+    # Reserved before the response starts, replay and subscribe run without awaiting in between
+    # so no event is lost or doubled
+    missed = comment_events.replay(post_id, request.headers.get("last-event-id"))
+    subscription = comment_events.subscribe(post_id)
+    if subscription is None:
+        raise HTTPException(
+            status_code=503,
+            detail={"translation_code": "COMMENT_STREAM_BUSY", "message": "Too many open comment streams, fall back to polling"}
+        )
     
-    return comments_data
+    async def events():
+        try:
+            yield f"retry: {int(COMMENT_STREAM_HEARTBEAT * 1000)}\n\n"
+            if missed is None:
+                # Missed events are no longer buffered - client has to refetch the thread
+                yield "event: reset\ndata: {}\n\n"
+            else:
+                for event in missed:
+                    yield format_event(event)
+            
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), COMMENT_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if event is CLOSED:
+                    # Consumer fell behind - it reconnects with Last-Event-ID and catches up
+                    break
+                yield format_event(event)
+        finally:
+            comment_events.unsubscribe(subscription)
+    
+    # The background task also releases the slot when the client is gone before the body starts
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    }, background=BackgroundTask(comment_events.unsubscribe, subscription))
 
 @router.post("/post/{post_id}", response_model=dict, status_code=status.HTTP_201_CREATED)
 async def create_comment(
@@ -191,64 +499,90 @@ async def create_comment(
 ):
     """Dodaj komentarz do posta (tylko zalogowani użytkownicy)"""
     
-    # Check if post exists and is published
-    post = db.query(BlogPost).filter(
+    # Published post and parent comment (for replies) validated in one query
+    target = db.query(
+        BlogPost.id,
+        Comment.id.label("parent_id"),
+        Comment.parent_id.label("parent_parent_id")
+    ).outerjoin(Comment, and_(
+        Comment.id == comment_data.parent_id,
+        Comment.post_id == BlogPost.id
+    )).filter(
         BlogPost.id == post_id,
         BlogPost.is_published == True
     ).first()
-    if not post:
+    if not target:
         raise HTTPException(
             status_code=404, 
             detail={"translation_code": "POST_NOT_FOUND", "message": "Post not found or not published"}
         )
     
-    # Check if parent comment exists (for replies)
     if comment_data.parent_id:
-        parent_comment = db.query(Comment).filter(
-            Comment.id == comment_data.parent_id,
-            Comment.post_id == post_id
-        ).first()
-        if not parent_comment:
+        if target.parent_id is None:
             raise HTTPException(
                 status_code=404, 
                 detail={"translation_code": "PARENT_COMMENT_NOT_FOUND", "message": "Parent comment not found"}
             )
         
         # 🎯 OGRANICZENIE GŁĘBOKOŚCI: Maksymalnie 2 poziomy komentarzy
-        if parent_comment.parent_id is not None:
+        if target.parent_parent_id is not None:
             raise HTTPException(
                 status_code=400,
                 detail={"translation_code": "MAX_COMMENT_DEPTH", "message": "Nie można odpowiadać na odpowiedzi. Maksymalnie 2 poziomy komentarzy."}
-            )    # Create comment (tylko dla zalogowanych użytkowników)
-    new_comment = Comment(
+            )
+    
+    # Author is read before commit - committing expires current_user
+    user_id = current_user.id
+    author = comment_author_info(db, current_user)
+    
+    # Create comment (tylko dla zalogowanych użytkowników), server-generated columns come back in the INSERT
+    inserted = db.execute(insert(Comment).values(
         post_id=post_id,
-        user_id=current_user.id,  # Wymagane - użytkownik musi być zalogowany
+        user_id=user_id,  # Wymagane - użytkownik musi być zalogowany
         parent_id=comment_data.parent_id,
         content=comment_data.content,
         ip_address=get_client_ip(request)
-    )
+    ).returning(Comment.id, Comment.created_at, Comment.updated_at)).one()
     
-    db.add(new_comment)
+    if comment_data.parent_id:
+        db.query(Comment).filter(Comment.id == comment_data.parent_id).update(
+            {Comment.replies_count: Comment.replies_count + 1, Comment.updated_at: Comment.updated_at},
+            synchronize_session=False
+        )
+    adjust_post_comment_stats(db, post_id, 1, 1 if comment_data.parent_id else 0)
     db.commit()
-    db.refresh(new_comment)
+    invalidate_comment_counts(post_id, comment_data.parent_id)
+    invalidate_comment_thread(post_id)
+    invalidate_post_listings(post_id)
     
     # 🎉 AUTOMATYCZNE SPRAWDZENIE AWANSU RANGI
-    # Aktualizuj statystyki użytkownika i sprawdź awans
-    rank_update = update_user_stats(current_user.id, db, "comment")
+    # Statystyki są zapisywane zbiorczo w tle (user_stats_buffer), awans po flushu
+    user_stats_buffer.record(user_id, "comment")
     
-    # Load relationships for response
-    # Load comment with all relationships for response
-    new_comment = db.query(Comment).options(
-        joinedload(Comment.user).joinedload(User.role),
-        joinedload(Comment.user).joinedload(User.rank),
-        joinedload(Comment.likes),
-        joinedload(Comment.replies)
-    ).filter(Comment.id == new_comment.id).first()
+    # Response from data in hand - a new comment has no votes or replies yet
+    new_comment = Comment(
+        id=inserted.id,
+        post_id=post_id,
+        user_id=user_id,
+        parent_id=comment_data.parent_id,
+        content=comment_data.content,
+        is_deleted=False,
+        created_at=inserted.created_at,
+        updated_at=inserted.updated_at,
+        likes_count=0,
+        dislikes_count=0,
+        replies_count=0
+    )
+    comment_base = build_comment_base(new_comment, author=author)
+    comment_events.publish(post_id, "created", comment_base)
+    
+    # Own comment - self-likes are not allowed, owner can edit and delete it
+    response = {**comment_base, "can_edit": True, "can_delete": True}
     
     # Dodaj info o awansie do odpowiedzi
-    response = build_comment_response(new_comment, current_user)
-    if rank_update.get("rank_check", {}).get("upgraded"):
-        response["rank_upgrade"] = rank_update["rank_check"]
+    rank_upgrade = user_stats_buffer.take_rank_upgrade(user_id)
+    if rank_upgrade:
+        response["rank_upgrade"] = rank_upgrade
     
     return response
 
@@ -290,22 +624,26 @@ async def update_comment(
     
     db.commit()
     db.refresh(comment)
+    invalidate_comment_thread(comment.post_id)
     
     # Load relationships for response
     comment = db.query(Comment).options(
         joinedload(Comment.user).joinedload(User.role),
-        joinedload(Comment.user).joinedload(User.rank),
-        joinedload(Comment.likes),
-        joinedload(Comment.replies)
+        joinedload(Comment.user).joinedload(User.rank)
     ).filter(Comment.id == comment.id).first()
+    comment_events.publish(comment.post_id, "edited", {
+        "id": comment.id,
+        "content": comment.content,
+        "updated_at": comment.updated_at
+    })
     
-    return build_comment_response(comment, current_user)
+    return build_comment_response(comment, current_user)  # Own comment - no viewer state
 
 @router.delete("/{comment_id}", response_model=APIResponse)
 async def delete_comment(
     comment_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)  # Only id and role are needed - claims suffice
 ):
     """Usuń komentarz - właściciel, moderator lub admin (soft delete)"""
     
@@ -341,10 +679,21 @@ async def delete_comment(
             detail={"translation_code": "COMMENT_DELETE_PERMISSION", "message": "Nie masz uprawnień do usunięcia tego komentarza. Możesz usuwać tylko swoje komentarze."}
         )
     
-    # Soft delete
+    # Soft delete (parent's reply counter and post stats only count non-deleted comments)
+    was_deleted = comment.is_deleted
     comment.is_deleted = True
+    if not was_deleted:
+        if comment.parent_id:
+            db.query(Comment).filter(Comment.id == comment.parent_id).update(
+                {Comment.replies_count: Comment.replies_count - 1, Comment.updated_at: Comment.updated_at},
+                synchronize_session=False
+            )
+        adjust_post_comment_stats(db, comment.post_id, -1, -1 if comment.parent_id else 0)
     
     db.commit()
+    invalidate_comment_thread(comment.post_id)
+    invalidate_post_listings(comment.post_id)
+    comment_events.publish(comment.post_id, "deleted", {"id": comment.id, "parent_id": comment.parent_id})
     
     return APIResponse(
         success=True,
@@ -362,7 +711,7 @@ async def like_comment(
 ):
     """Polub lub nie lubię komentarza"""
     
-    comment = db.query(Comment).filter(
+    comment = db.query(Comment.id, Comment.post_id, Comment.user_id).filter(
         Comment.id == comment_id,
         Comment.is_deleted == False
     ).first()
@@ -379,48 +728,40 @@ async def like_comment(
             detail={"translation_code": "SELF_LIKE_ERROR", "message": "Nie możesz polubić własnego komentarza"}
         )
     
-    # Check if user already liked/disliked this comment
-    existing_like = db.query(CommentLike).filter(
-        CommentLike.comment_id == comment_id,
-        CommentLike.user_id == current_user.id
-    ).first()
-    
-    if existing_like:
-        if existing_like.is_like == like_data.is_like:
-            # Same action - remove like/dislike
-            db.delete(existing_like)
-            action = "removed"
-        else:
-            # Different action - update like/dislike
-            existing_like.is_like = like_data.is_like
-            action = "updated"
-    else:
-        # New like/dislike
-        new_like = CommentLike(
-            comment_id=comment_id,
-            user_id=current_user.id,
-            is_like=like_data.is_like
-        )
-        db.add(new_like)
-        action = "added"
+    # Same vote again removes it, the other vote replaces it
+    toggle_like = toggle_like_upsert if is_postgres(db) else toggle_like_portable
+    action, likes_count, dislikes_count, score = toggle_like(db, comment_id, current_user.id, like_data.is_like)
     
     db.commit()
+    counters = {
+        "id": comment.id,
+        "likes_count": likes_count,
+        "dislikes_count": dislikes_count,
+        "score": score
+    }
+    if action != "unchanged":
+        invalidate_comment_thread(comment.post_id)
+        comment_events.publish(comment.post_id, "likes", counters)
     
     # 🎉 AUTOMATYCZNE SPRAWDZENIE AWANSU RANGI
     # Sprawdź awans dla właściciela komentarza jeśli otrzymał lajka
-    rank_update_info = None
     if like_data.is_like and action in ["added", "updated"]:
-        # Właściciel komentarza otrzymał lajka
-        rank_update = update_user_stats(comment.user_id, db, "like_received")
-        if rank_update.get("rank_check", {}).get("upgraded"):
-            rank_update_info = rank_update["rank_check"]
+        # Właściciel komentarza otrzymał lajka (zapis zbiorczy w tle)
+        user_stats_buffer.record(comment.user_id, "like_received")
+    rank_update_info = user_stats_buffer.take_rank_upgrade(comment.user_id)
     
     like_type = "like" if like_data.is_like else "dislike"
     response_data = {
         "success": True,
         "type": "success",
         "translation_code": "COMMENT_LIKE_SUCCESS",
-        "message": f"Comment {like_type} {action} successfully"
+        "message": f"Comment {like_type} {action} successfully",
+        # New counters and own vote - no need to refetch the thread
+        "data": {
+            **counters,
+            "action": action,
+            "user_like_status": None if action == "removed" else like_data.is_like
+        }
     }
     
     # Dodaj info o awansie właściciela komentarza
@@ -432,10 +773,13 @@ async def like_comment(
 @router.get("/{comment_id}/replies", response_model=List[dict])
 async def get_comment_replies(
     comment_id: int,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_user_optional),
+    current_user: Optional[UserSnapshot] = Depends(get_current_user_optional),
     page: int = Query(1, ge=1),
-    per_page: int = Query(20, ge=1, le=100)
+    per_page: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Keyset cursor (replies_next_cursor / X-Next-Cursor) - skips offset"),
+    include_total: bool = Query(True, description="Return total in X-Total-Count header (false skips counting)")
 ):
     """Pobierz odpowiedzi na komentarz"""
     
@@ -450,25 +794,60 @@ async def get_comment_replies(
     # Get replies with eager loading of user roles and ranks
     query = db.query(Comment).options(
         joinedload(Comment.user).joinedload(User.role),
-        joinedload(Comment.user).joinedload(User.rank),
-        joinedload(Comment.likes),
-        joinedload(Comment.replies)
+        joinedload(Comment.user).joinedload(User.rank)
     ).filter(
         Comment.parent_id == comment_id
-    ).order_by(Comment.created_at.asc())
+    ).order_by(*keyset_order(Comment.created_at, Comment.id, False, nullable=False))
+    
+    # Pagination (total is cached and counted without the eager-load joins)
+    if include_total:
+        total = cached_comment_count(("replies", comment_id), db.query(func.count(Comment.id)).filter(
+            Comment.parent_id == comment_id
+        ).scalar)
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
+    
+    if cursor:
+        value, last_id = decode_keyset_cursor(cursor)
+        query = query.filter(keyset_after(
+            Comment.created_at, Comment.id, decode_datetime(value), last_id, False, nullable=False
+        ))
+        replies = query.limit(per_page).all()
+    else:
+        replies = query.offset((page - 1) * per_page).limit(per_page).all()
     
-    # Pagination
-    total = query.count()
-    replies = query.offset((page - 1) * per_page).limit(per_page).all()
+    if len(replies) == per_page:
+        response.headers[NEXT_CURSOR_HEADER] = reply_cursor(replies[-1])
     
     # Build response
-    replies_data = [
-        build_comment_response(reply, current_user, False)
-        for reply in replies
-    ]
+    replies_data = [build_comment_base(reply) for reply in replies]
+    viewer_likes = load_viewer_likes(db, current_user, replies_data)
+    replies_data = [apply_viewer_state(reply, current_user, viewer_likes) for reply in replies_data]
     
     return replies_data
 
+@router.get("/stats", response_model=List[dict])
+async def get_posts_comment_stats(
+    post_ids: str = Query(..., description="Comma-separated list of post IDs (max 100)"),
+    db: Session = Depends(get_db)
+):
+    """Pobierz statystyki komentarzy dla wielu postów naraz"""
+    
+    id_list = parse_id_list(post_ids)
+    if len(id_list) > MAX_STATS_POST_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail={"translation_code": "TOO_MANY_POST_IDS", "message": f"At most {MAX_STATS_POST_IDS} post IDs per request"}
+        )
+    
+    # Unknown posts are omitted, posts without a counter row have no comments
+    rows = db.query(
+        BlogPost.id, BlogPostCommentStats.comment_count, BlogPostCommentStats.reply_count
+    ).outerjoin(
+        BlogPostCommentStats, BlogPostCommentStats.post_id == BlogPost.id
+    ).filter(BlogPost.id.in_(id_list)).order_by(BlogPost.id).all() if id_list else []
+    
+    return [comment_stats_response(post_id, comments or 0, replies or 0) for post_id, comments, replies in rows]
+
 @router.get("/stats/{post_id}")
 async def get_post_comment_stats(
     post_id: int,
@@ -476,29 +855,16 @@ async def get_post_comment_stats(
 ):
     """Pobierz statystyki komentarzy dla posta"""
     
-    # Check if post exists
-    post = db.query(BlogPost).filter(BlogPost.id == post_id).first()
-    if not post:
+    # Existence check and maintained counters in one query
+    row = db.query(
+        BlogPost.id, BlogPostCommentStats.comment_count, BlogPostCommentStats.reply_count
+    ).outerjoin(
+        BlogPostCommentStats, BlogPostCommentStats.post_id == BlogPost.id
+    ).filter(BlogPost.id == post_id).first()
+    if not row:
         raise HTTPException(
             status_code=404, 
             detail={"translation_code": "POST_NOT_FOUND", "message": "Post not found"}
         )
     
-    # Get stats
-    total_comments = db.query(Comment).filter(
-        Comment.post_id == post_id,
-        Comment.is_deleted == False
-    ).count()
-    
-    total_replies = db.query(Comment).filter(
-        Comment.post_id == post_id,
-        Comment.parent_id.isnot(None),
-        Comment.is_deleted == False
-    ).count()
-    
-    return {
-        "post_id": post_id,
-        "total_comments": total_comments,
-        "total_replies": total_replies,
-        "total_interactions": total_comments
-    }
+    return comment_stats_response(post_id, row.comment_count or 0, row.reply_count or 0)
@@ -9,9 +9,10 @@ from ..database import get_db
 from ..models import User, UserRoleEnum, Comment, CommentLike, APIKey
 from ..schemas import APIResponse
 from ..security import (
-    get_current_user, verify_password, get_password_hash, 
+    get_current_user, verify_password_async, get_password_hash_async, revoke_claims,
     is_password_strong, is_email_valid
 )
+from ..identity_cache import invalidate_identity
 from pydantic import BaseModel, Field
 
 router = APIRouter(prefix="/profile", tags=["user profile"])
@@ -50,14 +51,14 @@ async def change_password(
         )
     
     # Sprawdź obecne hasło
-    if not verify_password(request.current_password, current_user.hashed_password):
+    if not await verify_password_async(request.current_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"translation_code": "INVALID_CURRENT_PASSWORD", "message": "Nieprawidłowe obecne hasło"}
         )
     
     # Sprawdź czy nowe hasło nie jest takie same jak obecne
-    if verify_password(request.new_password, current_user.hashed_password):
+    if await verify_password_async(request.new_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"translation_code": "SAME_PASSWORD", "message": "Nowe hasło musi być różne od obecnego"}
@@ -72,7 +73,7 @@ async def change_password(
         )
     
     # Zaktualizuj hasło
-    current_user.hashed_password = get_password_hash(request.new_password)
+    current_user.hashed_password = await get_password_hash_async(request.new_password)
     current_user.failed_login_attempts = 0  # Resetuj nieudane próby
     current_user.account_locked_until = None  # Odblokuj konto jeśli było zablokowane
     
@@ -94,7 +95,7 @@ async def change_username(
     """Zmień username/nick użytkownika (wymaga hasła + weryfikacja unikalności)"""
     
     # Sprawdź obecne hasło
-    if not verify_password(request.current_password, current_user.hashed_password):
+    if not await verify_password_async(request.current_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"translation_code": "INVALID_CURRENT_PASSWORD", "message": "Nieprawidłowe hasło"}
@@ -132,6 +133,7 @@ async def change_username(
     current_user.username = request.new_username
     
     db.commit()
+    invalidate_identity(current_user.id)
     
     return APIResponse(
         success=True,
@@ -149,7 +151,7 @@ async def change_email(
     """Zmień email użytkownika (wymaga hasła + weryfikacja unikalności)"""
     
     # Sprawdź obecne hasło
-    if not verify_password(request.current_password, current_user.hashed_password):
+    if not await verify_password_async(request.current_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"translation_code": "INVALID_CURRENT_PASSWORD", "message": "Nieprawidłowe hasło"}
@@ -189,6 +191,7 @@ async def change_email(
     current_user.verification_expires_at = None
     
     db.commit()
+    invalidate_identity(current_user.id)
     
     return APIResponse(
         success=True,
@@ -210,7 +213,7 @@ async def delete_account(
     """
     
     # Sprawdź obecne hasło
-    if not verify_password(request.current_password, current_user.hashed_password):
+    if not await verify_password_async(request.current_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"translation_code": "INVALID_CURRENT_PASSWORD", "message": "Nieprawidłowe hasło"}
@@ -234,6 +237,7 @@ async def delete_account(
     deleted_username = current_user.username
     deleted_email = current_user.email
     deleted_id = current_user.id
+    deleted_role_version = current_user.role_version or 0
     
     try:
         # 🗑️ USUNIĘCIE KONTA
@@ -251,6 +255,8 @@ async def delete_account(
         # 4. Usuń użytkownika
         db.delete(current_user)
         db.commit()
+        invalidate_identity(deleted_id)
+        revoke_claims(deleted_id, deleted_role_version + 1)
         
         # Log usunięcia konta (opcjonalnie można zapisać do tabeli audytu)
         print(f"🗑️ KONTO USUNIĘTE: ID={deleted_id}, username={deleted_username}, email={deleted_email}")
@@ -8,8 +8,9 @@ from typing import List
 from ..database import get_db
 from ..models import User, UserRole, UserRank, UserRoleEnum, UserRankEnum
 from ..schemas import UserRole as UserRoleSchema, UserRank as UserRankSchema, UserWithRoleRank
-from ..security import get_current_user, get_current_admin_user
+from ..security import get_current_user, get_current_admin_user, get_current_principal, revoke_claims, PERMISSIONS
 from ..rank_utils import auto_check_rank_upgrade
+from ..identity_cache import invalidate_identity
 
 router = APIRouter(prefix="/api/roles", tags=["User Roles & Ranks"])
 
@@ -37,7 +38,7 @@ def get_all_ranks(
 def get_user_role_rank(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
     """Pobierz informacje o roli i randze użytkownika"""
     user = db.query(User).options(
@@ -90,8 +91,11 @@ def assign_user_role(
         )
     
     user.role_id = role.id
+    user.role_version = (user.role_version or 0) + 1
     
     db.commit()
+    invalidate_identity(user_id)
+    revoke_claims(user_id, user.role_version)
     
     return {
         "success": True,
@@ -122,6 +126,7 @@ def assign_user_rank(
     
     user.rank_id = rank.id
     db.commit()
+    invalidate_identity(user_id)
     
     return {
         "success": True,
@@ -132,7 +137,7 @@ def assign_user_rank(
 def check_rank_upgrade(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
     """Sprawdź i automatycznie awansuj rangę użytkownika (manualnie)"""
     
@@ -162,12 +167,7 @@ def get_available_permissions(
 ):
     """Lista wszystkich dostępnych uprawnień w systemie"""
     return {
-        "permissions": [
-            "comment.create", "comment.like", "comment.moderate", "comment.delete",
-            "post.create", "post.edit", "post.delete", "post.publish",
-            "user.manage", "role.manage", "system.admin",
-            "profile.edit", "profile.view"
-        ],
+        "permissions": list(PERMISSIONS),
         "roles": list(UserRoleEnum),
         "ranks": list(UserRankEnum)
     }
@@ -131,6 +131,11 @@ class Tag(TagCreate):
     class Config:
         from_attributes = True
 
+class TagFacet(BaseModel):
+    """Tag with its number of published posts"""
+    tag_name: str
+    count: int
+
 # User Schemas (for authentication)
 class UserBase(BaseModel):
     username: str = Field(..., min_length=3, max_length=50)
@@ -298,10 +303,11 @@ class APIResponse(BaseModel):
 
 class PaginatedResponse(BaseModel):
     items: List[dict]
-    total: int
-    page: int
-    pages: int
+    total: Optional[int] = None  # None when the count was skipped (cursor pagination)
+    page: Optional[int] = None
+    pages: Optional[int] = None
     per_page: int
+    next_cursor: Optional[str] = None  # Opaque keyset cursor for the next page
 
 # 🎯 USER ROLES AND RANKS SCHEMAS
 class UserRoleBase(BaseModel):
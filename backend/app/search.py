@@ -0,0 +1,226 @@
+"""
+Full-text search over blog post translations
+
+On PostgreSQL every translation keeps a weighted `tsvector` (title > excerpt >
+content) built with the text search dictionary of its language and indexed
+with GIN, so search is an index lookup ranked with `ts_rank_cd`.
+
+Other databases (SQLite in development and tests) use an in-process inverted
+index. It is synchronized lazily from (post_id, translation updated_at) pairs,
+so only changed translations are re-tokenized and query cost depends on the
+matching posts, not on the size of the archive.
+"""
+import html
+import math
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import cast, event, func, literal, tuple_
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.orm import Session
+
+from .models import BlogPost, BlogPostTranslation
+
+# Language.code -> PostgreSQL text search configuration ('simple' = no stemming)
+LANGUAGE_DICTIONARIES = {
+    "da": "danish",
+    "de": "german",
+    "en": "english",
+    "es": "spanish",
+    "fi": "finnish",
+    "fr": "french",
+    "hu": "hungarian",
+    "it": "italian",
+    "nl": "dutch",
+    "no": "norwegian",
+    "pt": "portuguese",
+    "ro": "romanian",
+    "ru": "russian",
+    "sv": "swedish",
+    "tr": "turkish",
+}
+DEFAULT_DICTIONARY = "simple"  # e.g. Polish - no built-in stemmer
+
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10"
+
+# Field weights for the fallback index (mirror setweight A/B/C)
+FIELD_WEIGHTS = {"title": 1.0, "excerpt": 0.4, "content": 0.2}
+SNIPPET_WORDS = 30
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def text_search_config(language_code: str) -> str:
+    """Text search configuration for a language code"""
+    return LANGUAGE_DICTIONARIES.get((language_code or "").split("-")[0].lower(), DEFAULT_DICTIONARY)
+
+
+def is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def build_search_vector(language_code: str, title: str, excerpt: Optional[str], content: str):
+    """Weighted tsvector expression for a translation (PostgreSQL only)"""
+    config = cast(literal(text_search_config(language_code)), REGCONFIG)
+    return (
+        func.setweight(func.to_tsvector(config, title or ""), "A")
+        .op("||")(func.setweight(func.to_tsvector(config, excerpt or ""), "B"))
+        .op("||")(func.setweight(func.to_tsvector(config, content or ""), "C"))
+    )
+
+
+@event.listens_for(BlogPostTranslation, "before_insert")
+@event.listens_for(BlogPostTranslation, "before_update")
+def _refresh_search_vector(mapper, connection, target: BlogPostTranslation) -> None:
+    """Rebuild search_vector on every translation write (PostgreSQL only)"""
+    if connection.dialect.name != "postgresql":
+        return
+    target.search_vector = build_search_vector(
+        target.language_code, target.title, target.excerpt, target.content
+    )
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def make_snippet(content: str, terms: set, words: int = SNIPPET_WORDS) -> str:
+    """Fragment of content around the first matching term, matches wrapped in <mark>"""
+    tokens = content.split()
+    lowered = [" ".join(tokenize(token)) for token in tokens]
+    first = next((i for i, token in enumerate(lowered) if terms.intersection(token.split())), 0)
+    start = max(0, first - words // 3)
+    fragment = []
+    for token, normalized in zip(tokens[start:start + words], lowered[start:start + words]):
+        escaped = html.escape(token)
+        fragment.append(f"<mark>{escaped}</mark>" if terms.intersection(normalized.split()) else escaped)
+    return " ".join(fragment)
+
+
+class InvertedIndex:
+    """Per-language in-process inverted index used when PostgreSQL is not available"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # language -> post_id -> (translation_id, updated_at)
+        self._versions: Dict[str, Dict[int, tuple]] = {}
+        # language -> token -> post_id -> weighted term frequency
+        self._postings: Dict[str, Dict[str, Dict[int, float]]] = {}
+        # language -> post_id -> content (for snippets)
+        self._contents: Dict[str, Dict[int, str]] = {}
+
+    def _remove(self, language: str, post_id: int) -> None:
+        postings = self._postings.get(language, {})
+        for token in list(postings):
+            postings[token].pop(post_id, None)
+            if not postings[token]:
+                del postings[token]
+        self._versions.get(language, {}).pop(post_id, None)
+        self._contents.get(language, {}).pop(post_id, None)
+
+    def _add(self, language: str, post_id: int, version: tuple, title: str, excerpt: Optional[str], content: str) -> None:
+        postings = self._postings.setdefault(language, {})
+        for field, text in (("title", title), ("excerpt", excerpt), ("content", content)):
+            for token in tokenize(text):
+                bucket = postings.setdefault(token, {})
+                bucket[post_id] = bucket.get(post_id, 0.0) + FIELD_WEIGHTS[field]
+        self._versions.setdefault(language, {})[post_id] = version
+        self._contents.setdefault(language, {})[post_id] = content or ""
+
+    def sync(self, db: Session, language: str) -> None:
+        """Re-index translations added, changed, unpublished or removed since the last sync"""
+        current = {
+            post_id: (translation_id, updated_at)
+            for post_id, translation_id, updated_at in db.query(
+                BlogPostTranslation.post_id, BlogPostTranslation.id, BlogPostTranslation.updated_at
+            ).join(BlogPost, BlogPost.id == BlogPostTranslation.post_id).filter(
+                BlogPostTranslation.language_code == language,
+                BlogPost.is_published == True
+            )
+        }
+
+        with self._lock:
+            known = self._versions.get(language, {})
+            stale = [post_id for post_id, version in known.items() if current.get(post_id) != version]
+            changed = [post_id for post_id, version in current.items() if known.get(post_id) != version]
+            for post_id in stale:
+                self._remove(language, post_id)
+
+        if not changed:
+            return
+
+        rows = db.query(
+            BlogPostTranslation.post_id, BlogPostTranslation.title,
+            BlogPostTranslation.excerpt, BlogPostTranslation.content
+        ).filter(
+            BlogPostTranslation.language_code == language,
+            BlogPostTranslation.post_id.in_(changed)
+        ).all()
+
+        with self._lock:
+            for post_id, title, excerpt, content in rows:
+                self._remove(language, post_id)
+                self._add(language, post_id, current[post_id], title, excerpt, content)
+
+    def search(self, language: str, query: str) -> List[Tuple[float, int, str]]:
+        """All matching posts as (score, post_id, snippet), best first - every term must match"""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            postings = self._postings.get(language, {})
+            buckets = [postings.get(term) for term in terms]
+            if not all(buckets):
+                return []
+
+            total_docs = len(self._versions.get(language, {})) or 1
+            candidates = set.intersection(*(set(bucket) for bucket in buckets))
+            results = []
+            for post_id in candidates:
+                score = sum(
+                    bucket[post_id] * math.log(1 + total_docs / len(bucket))
+                    for bucket in buckets
+                )
+                results.append((round(score, 6), post_id, self._contents[language][post_id]))
+
+        results.sort(key=lambda result: (result[0], result[1]), reverse=True)
+        return [(score, post_id, make_snippet(content, terms)) for score, post_id, content in results]
+
+
+fallback_index = InvertedIndex()
+
+
+def search_posts(db: Session, query: str, language: str, limit: int,
+                 after: Optional[Tuple[float, int]] = None) -> List[Tuple[int, float, str]]:
+    """
+    Ranked page of published posts matching `query` in `language`
+    Returns (post_id, rank, snippet) ordered by rank desc, post id desc;
+    `after` is the (rank, post_id) of the last row of the previous page.
+    """
+    if is_postgres(db):
+        config = cast(literal(text_search_config(language)), REGCONFIG)
+        ts_query = func.websearch_to_tsquery(config, query)
+        rank = func.ts_rank_cd(BlogPostTranslation.search_vector, ts_query)
+
+        rows = db.query(
+            BlogPost.id,
+            rank.label("rank"),
+            func.ts_headline(config, BlogPostTranslation.content, ts_query, HEADLINE_OPTIONS).label("snippet")
+        ).join(BlogPostTranslation, BlogPostTranslation.post_id == BlogPost.id).filter(
+            BlogPostTranslation.language_code == language,
+            BlogPostTranslation.search_vector.op("@@")(ts_query),
+            BlogPost.is_published == True
+        )
+        if after is not None:
+            rows = rows.filter(tuple_(rank, BlogPost.id) < tuple_(after[0], after[1]))
+
+        rows = rows.order_by(rank.desc(), BlogPost.id.desc()).limit(limit).all()
+        return [(post_id, float(score), snippet) for post_id, score, snippet in rows]
+
+    fallback_index.sync(db, language)
+    results = fallback_index.search(language, query)
+    if after is not None:
+        results = [result for result in results if (result[0], result[1]) < tuple(after)]
+    return [(post_id, score, snippet) for score, post_id, snippet in results[:limit]]
@@ -7,27 +7,55 @@ from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
-from slowapi import Limiter, _rate_limit_exceeded_handler
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session, joinedload
+from slowapi import _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 import secrets
 import hashlib
+import hmac
+import logging
 import os
 
 from .database import get_db
 from .models import User, APIKey, UserRoleEnum
+from .crypto_executor import password_executor, CryptoExecutorBusy
+from .rate_limiting import create_limiter, create_shared_storage
+from .identity_cache import UserSnapshot, cache_identity, cached_identity, identity_generation
 from .datetime_utils import safe_current_time, is_datetime_expired, make_timezone_aware
 
 # Import Response for cookie handling  
 from fastapi import Response
 
+logger = logging.getLogger(__name__)
+
 # Security configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-super-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 15  # 15 minutes for access token
 REFRESH_TOKEN_EXPIRE_DAYS = 7     # 7 days for refresh token
 
+# Opt-in: embed user id, role and permission bitmask in access tokens so that
+# admin / permission checks authorize without loading the user
+ACCESS_TOKEN_CLAIMS = os.getenv("ACCESS_TOKEN_CLAIMS", "false").lower() == "true"
+
+# Bit positions of the "perm" claim - only append, never reorder or remove
+PERMISSIONS = (
+    "comment.create", "comment.like", "comment.moderate", "comment.delete",
+    "post.create", "post.edit", "post.delete", "post.publish",
+    "user.manage", "role.manage", "system.admin",
+    "profile.edit", "profile.view"
+)
+
+# Revoked claim tokens live in the rate-limit storage (RATE_LIMIT_STORAGE_URI) so every
+# worker sees them - with memory:// only the worker that made the change does
+claims_revocations = create_shared_storage()
+
+# Email verification codes - HMAC scheme tag and wrong guesses allowed per issued code
+VERIFICATION_HASH_SCHEME = "hmac-sha256"
+VERIFICATION_CODE_MAX_ATTEMPTS = int(os.getenv("VERIFICATION_CODE_MAX_ATTEMPTS", "5"))
+
 # Password hashing with enhanced security
 pwd_context = CryptContext(
     schemes=["bcrypt"], 
@@ -39,8 +67,8 @@ pwd_context = CryptContext(
 # JWT Bearer token security
 security = HTTPBearer()
 
-# Rate limiting setup
-limiter = Limiter(key_func=get_remote_address)
+# Rate limiting setup - RATE_LIMIT_STORAGE_URI shares the counters between workers
+limiter = create_limiter(get_remote_address)
 
 # Environment configuration
 ENVIRONMENT = os.getenv("ENVIRONMENT", "production").lower()
@@ -61,6 +89,25 @@ def get_password_hash(password: str) -> str:
     """Hash a password for storing in database"""
     return pwd_context.hash(password)
 
+async def run_password_job(fn, *args):
+    """Run bcrypt work on the bounded password executor - never on the event loop"""
+    try:
+        return await password_executor.run(fn, *args)
+    except CryptoExecutorBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={"translation_code": "SERVER_BUSY", "message": "Too many authentication requests, try again shortly"},
+            headers={"Retry-After": "1"}
+        )
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password for async endpoints"""
+    return await run_password_job(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash for async endpoints"""
+    return await run_password_job(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Union[timedelta, None] = None):
     """Create a JWT access token with enhanced security"""
     to_encode = data.copy()
@@ -80,6 +127,48 @@ def create_access_token(data: dict, expires_delta: Union[timedelta, None] = None
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def permission_mask(permissions) -> int:
+    """Compact bitmask of known permissions (see PERMISSIONS)"""
+    return sum(1 << PERMISSIONS.index(permission) for permission in set(permissions or ()) if permission in PERMISSIONS)
+
+def permissions_from_mask(mask: int) -> list:
+    return [permission for bit, permission in enumerate(PERMISSIONS) if mask & (1 << bit)]
+
+def access_token_data(user: User) -> dict:
+    """Claims of a user's access token - subject only, plus authorization claims when ACCESS_TOKEN_CLAIMS is on"""
+    data = {"sub": user.email}  # Use email as subject
+    if ACCESS_TOKEN_CLAIMS:
+        data.update({
+            "uid": user.id,
+            "role": user.role.name.value if user.role else None,
+            "lvl": user.role.level if user.role else 0,
+            "perm": permission_mask(user.role.permissions) if user.role else 0,
+            "rv": user.role_version or 0
+        })
+    return data
+
+def claims_revocation_key(user_id: int, role_version: int) -> str:
+    """Storage key marking claim tokens of the user with an rv below role_version as revoked"""
+    return f"claims-revoked/{user_id}/{role_version}"
+
+def revoke_claims(user_id: int, role_version: int) -> None:
+    """
+    Reject claim tokens of the user issued before role_version, in every worker (call after commit)
+    role_version only grows by one, so a token with rv=n is revoked exactly when the key of n+1 exists.
+    The key outlives every access token issued before the change.
+    """
+    try:
+        claims_revocations.incr(claims_revocation_key(user_id, role_version), ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+    except claims_revocations.base_exceptions as e:
+        logger.error(f"Could not revoke claim tokens of user {user_id}: {str(e)}")
+
+def claims_revoked(payload: dict) -> Optional[bool]:
+    """Whether a newer role_version revoked the claim token (None when the storage is unavailable)"""
+    try:
+        return claims_revocations.get(claims_revocation_key(payload["uid"], payload.get("rv", 0) + 1)) > 0
+    except claims_revocations.base_exceptions:
+        return None
+
 def create_refresh_token(user_id: int):
     """Create JWT refresh token"""
     data = {
@@ -170,6 +259,14 @@ def get_user_by_email(db: Session, email: str) -> Optional[User]:
     """Get user by email"""
     return db.query(User).filter(User.email == email).first()
 
+def get_user_by_subject(db: Session, subject: str) -> Optional[User]:
+    """User for a token subject - email, or username for older tokens (one query, role and rank loaded)"""
+    return db.query(User).options(
+        joinedload(User.role), joinedload(User.rank)
+    ).filter(
+        or_(User.email == subject, User.username == subject)
+    ).order_by((User.email == subject).desc()).first()
+
 def handle_failed_login(db: Session, email: str) -> None:
     """Handle failed login attempt - increment counter and lock account if needed"""
     user = get_user_by_email(db, email)
@@ -211,14 +308,14 @@ def is_password_strong(password: str) -> tuple[bool, str]:
     
     return True, "Password is strong"
 
-def authenticate_user(db: Session, email: str, password: str) -> Union[User, bool]:
+async def authenticate_user(db: Session, email: str, password: str) -> Union[User, bool]:
     """Authenticate user with email and password (email-only authentication)"""
     # Only authenticate by email for better security
     user = get_user_by_email(db, email)
     
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return False
     
     # Check if account is locked
@@ -263,13 +360,16 @@ def get_current_user(
         if user_identifier is None:
             raise credentials_exception
         
-        # Try to get user by email first, fallback to username for backward compatibility
-        user = get_user_by_email(db, user_identifier)
-        if not user:
-            user = get_user_by_username(db, user_identifier)
-            
+        # Cached identity only saves the subject lookup - write endpoints get the session-bound user
+        snapshot = cached_identity(user_identifier)
+        user = db.get(User, snapshot.id) if snapshot else None
         if user is None:
-            raise credentials_exception
+            # Email first, fallback to username for backward compatibility
+            generation = identity_generation()
+            user = get_user_by_subject(db, user_identifier)
+            if user is None:
+                raise credentials_exception
+            cache_identity(user_identifier, user, generation)
             
     except JWTError:
         raise credentials_exception
@@ -285,8 +385,11 @@ def get_current_active_user(current_user: User = Depends(get_current_user)) -> U
 def get_current_user_optional(
     request: Request,
     db: Session = Depends(get_db)
-) -> Optional[User]:
-    """Get current user optionally (returns None if no token provided)"""
+) -> Optional[UserSnapshot]:
+    """
+    Get current user optionally (returns None if no token provided)
+    Returns a read-only UserSnapshot from the identity cache - no DB hit for known callers.
+    """
     token = get_token_from_cookie(request, "access_token")
     if not token:
         return None
@@ -300,18 +403,80 @@ def get_current_user_optional(
         if user_identifier is None:
             return None
         
-        # Try to get user by email first, fallback to username
-        user = get_user_by_email(db, user_identifier)
-        if not user:
-            user = get_user_by_username(db, user_identifier)
+        snapshot = cached_identity(user_identifier)
+        if snapshot is None:
+            # Email first, fallback to username
+            generation = identity_generation()
+            user = get_user_by_subject(db, user_identifier)
+            if user is None:
+                return None
+            snapshot = cache_identity(user_identifier, user, generation)
             
-        return user if user and user.is_active else None
+        return snapshot if snapshot.is_active else None
         
     except JWTError:
         return None
 
-def get_current_admin_user(current_user: User = Depends(get_current_active_user)) -> User:
-    """Get current admin user - checks role-based permissions"""
+class ClaimsRole:
+    """Role as carried by access token claims"""
+    
+    def __init__(self, name: str, level: int, permissions: list):
+        self.name = UserRoleEnum(name)
+        self.level = level
+        self.permissions = permissions
+
+class TokenPrincipal:
+    """Caller authorized from access token claims alone (id, role, permissions - no DB)"""
+    is_active = True  # Tokens of deleted accounts are revoked (revoke_claims), refresh reloads the user
+    
+    def __init__(self, payload: dict):
+        self.id = payload["uid"]
+        self.email = payload["sub"]
+        self.role_version = payload.get("rv", 0)
+        self.role = ClaimsRole(payload["role"], payload.get("lvl", 0), permissions_from_mask(payload.get("perm", 0))) if payload.get("role") else None
+    
+    def has_permission(self, permission: str) -> bool:
+        return bool(self.role) and permission in self.role.permissions
+
+def get_token_principal(request: Request) -> Optional[TokenPrincipal]:
+    """
+    Principal from a claims access token (None when claims are off or the token has none)
+    Tokens issued before the user's last role change or account deletion are rejected, the client
+    refreshes them. If the revocation storage is unavailable the caller is loaded from the database.
+    """
+    if not ACCESS_TOKEN_CLAIMS:
+        return None
+    token = get_token_from_cookie(request, "access_token")
+    payload = verify_token(token, "access") if token else None
+    if not payload or "uid" not in payload:
+        return None
+    
+    revoked = claims_revoked(payload)
+    if revoked is None:
+        return None
+    if revoked:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail={"translation_code": "TOKEN_REFRESH_REQUIRED", "message": "Permissions changed, refresh the access token"}
+        )
+    try:
+        return TokenPrincipal(payload)
+    except (KeyError, ValueError):
+        return None
+
+def get_current_principal(
+    request: Request,
+    db: Session = Depends(get_db)
+) -> Union[TokenPrincipal, User]:
+    """Caller for authorization-only checks - from token claims when available, loaded user otherwise"""
+    return get_token_principal(request) or get_current_user(request, db)
+
+def get_current_admin_user(
+    request: Request,
+    db: Session = Depends(get_db)
+) -> Union[TokenPrincipal, User]:
+    """Get current admin user - checks role-based permissions (from token claims when available)"""
+    current_user = get_token_principal(request) or get_current_active_user(get_current_user(request, db))
     # Check if user has admin role
     if not current_user.role or current_user.role.name != UserRoleEnum.ADMIN:
         raise HTTPException(
@@ -362,9 +527,10 @@ def require_permission(permission: str):
     """Decorator to require specific permission"""
     def permission_checker(
         request: Request,
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        db: Session = Depends(get_db)
     ):
+        current_user = get_token_principal(request) or get_current_active_user(get_current_user(request, db))
+        
         # Check if user has admin role (admins have all permissions)
         if current_user.role and current_user.role.name == UserRoleEnum.ADMIN:
             return current_user
@@ -487,16 +653,55 @@ def verify_verification_token(token: str) -> Optional[dict]:
     except JWTError:
         return None
 
+def verification_code_digest(code: str, salt: str) -> str:
+    """HMAC-SHA256 of a verification code keyed with SECRET_KEY"""
+    message = f"email-verification:{salt}:{code}".encode()
+    return hmac.new(SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
 def hash_verification_code(code: str) -> str:
-    """Hash verification code for storage using bcrypt (secure)"""
-    return pwd_context.hash(code)
+    """
+    Hash verification code for storage - keyed HMAC with a fresh salt, stored as "hmac-sha256$salt$digest"
+    The code lives 15 minutes and allows VERIFICATION_CODE_MAX_ATTEMPTS guesses, so a slow hash buys nothing;
+    without SECRET_KEY a leaked hash cannot be brute-forced offline.
+    """
+    salt = secrets.token_hex(16)
+    return f"{VERIFICATION_HASH_SCHEME}${salt}${verification_code_digest(code, salt)}"
+
+def is_legacy_verification_hash(hashed_code: str) -> bool:
+    """Codes issued before the HMAC scheme are bcrypt hashes"""
+    return hashed_code.startswith("$2")
 
 def verify_verification_code(plain_code: str, hashed_code: str) -> bool:
-    """Verify verification code against bcrypt hash"""
-    try:
-        return pwd_context.verify(plain_code, hashed_code)
-    except Exception:
+    """Verify verification code against its stored hash (constant-time)"""
+    if is_legacy_verification_hash(hashed_code):
+        try:
+            return pwd_context.verify(plain_code, hashed_code)
+        except Exception:
+            return False
+    scheme, _, rest = hashed_code.partition("$")
+    salt, _, digest = rest.partition("$")
+    if scheme != VERIFICATION_HASH_SCHEME or not salt or not digest:
         return False
+    return hmac.compare_digest(verification_code_digest(plain_code, salt), digest)
+
+async def verify_verification_code_async(plain_code: str, hashed_code: str) -> bool:
+    """verify_verification_code for async endpoints - legacy bcrypt hashes go through the password executor"""
+    if is_legacy_verification_hash(hashed_code):
+        return await run_password_job(verify_verification_code, plain_code, hashed_code)
+    return verify_verification_code(plain_code, hashed_code)
+
+def reserve_verification_attempt(db: Session, user_id: int) -> bool:
+    """
+    Count a verification attempt before the code is checked (atomic, so parallel guesses cannot exceed the limit)
+    Returns False when the user already used VERIFICATION_CODE_MAX_ATTEMPTS on the current code.
+    """
+    attempts = func.coalesce(User.verification_attempts, 0)
+    reserved = db.query(User).filter(
+        User.id == user_id,
+        attempts < VERIFICATION_CODE_MAX_ATTEMPTS
+    ).update({User.verification_attempts: attempts + 1}, synchronize_session=False)
+    db.commit()
+    return bool(reserved)
 
 # Email sending functionality using Resend
 async def send_verification_email(email: str, verification_code: str, verification_token: str) -> bool:
@@ -0,0 +1,84 @@
+"""
+Utilities for normalized blog tags (post <-> tag association and facet counters)
+"""
+from typing import Iterable, List, Optional
+
+from sqlalchemy import distinct, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .models import BlogPost, Tag, blog_post_tags
+
+
+def normalize_tag_names(names: Optional[Iterable[str]]) -> List[str]:
+    """Strip names, drop empty ones and duplicates (first occurrence wins)"""
+    result = []
+    for name in names or []:
+        name = name.strip()
+        if name and name not in result:
+            result.append(name)
+    return result
+
+
+def get_or_create_tags(db: Session, names: Iterable[str]) -> List[Tag]:
+    """Tag rows for the given names, creating missing ones (safe against concurrent inserts)"""
+    names = normalize_tag_names(names)
+    if not names:
+        return []
+
+    tags = {tag.tag_name: tag for tag in db.query(Tag).filter(Tag.tag_name.in_(names))}
+    for name in names:
+        if name in tags:
+            continue
+        try:
+            with db.begin_nested():
+                tag = Tag(tag_name=name, published_post_count=0)
+                db.add(tag)
+        except IntegrityError:
+            # Created by another request in the meantime (unique tag_name)
+            tag = db.query(Tag).filter(Tag.tag_name == name).one()
+        tags[name] = tag
+
+    return [tags[name] for name in names]
+
+
+def refresh_tag_counts(db: Session, tag_names: Optional[Iterable[str]] = None) -> None:
+    """
+    Recompute published_post_count for the given tags (all tags when None)
+    Call before commit after publishing, unpublishing, deleting or retagging a post.
+    """
+    if tag_names is not None:
+        tag_names = list(tag_names)
+        if not tag_names:
+            return
+
+    db.flush()
+    published_posts = select(func.count()).select_from(
+        blog_post_tags.join(BlogPost, BlogPost.id == blog_post_tags.c.post_id)
+    ).where(
+        blog_post_tags.c.tag_id == Tag.id,
+        BlogPost.is_published == True
+    ).scalar_subquery()
+
+    statement = update(Tag).values(published_post_count=published_posts)
+    if tag_names is not None:
+        statement = statement.where(Tag.tag_name.in_(tag_names))
+    db.execute(statement.execution_options(synchronize_session=False))
+
+
+def tag_filter(tag_names: Iterable[str], mode: str = "any"):
+    """
+    Filter on BlogPost.id for posts having any / all of the tags
+    Uses a semi-join subquery, so posts are never duplicated by the tag join.
+    """
+    tag_names = list(tag_names)
+    post_ids = select(blog_post_tags.c.post_id).join(
+        Tag, Tag.id == blog_post_tags.c.tag_id
+    ).where(Tag.tag_name.in_(tag_names))
+
+    if mode == "all":
+        post_ids = post_ids.group_by(blog_post_tags.c.post_id).having(
+            func.count(distinct(blog_post_tags.c.tag_id)) == len(tag_names)
+        )
+
+    return BlogPost.id.in_(post_ids)
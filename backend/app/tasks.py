@@ -62,6 +62,7 @@ async def cleanup_expired_verification_codes():
                 user.verification_code_hash = None
                 user.verification_token = None
                 user.verification_expires_at = None
+                user.verification_attempts = 0
             
             db.commit()
             logger.info(f"Successfully cleaned up {len(expired_verifications)} expired verification codes")
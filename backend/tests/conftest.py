@@ -0,0 +1,33 @@
+"""
+Shared fixtures - every test gets an empty schema
+
+Tests run on a throwaway SQLite file. Set TEST_DATABASE_URL to an empty
+PostgreSQL database to also cover the PostgreSQL-only paths (its tables are
+dropped and recreated for every test).
+"""
+import os
+import sys
+import tempfile
+
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ.setdefault("RESEND_API_KEY", "re_test")  # Required by app.main, no mail is sent
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from app.database import Base, SessionLocal, engine
+import app.models  # noqa: F401 - registers all tables
+
+
+@pytest.fixture
+def db():
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(engine)
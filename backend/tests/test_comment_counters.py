@@ -0,0 +1,147 @@
+"""Maintained comment counters - votes (both toggle implementations) and per-post comment stats"""
+from datetime import datetime
+
+import pytest
+
+from app.comment_stats import adjust_post_comment_stats, count_post_comments
+from app.models import BlogPost, BlogPostCommentStats, Comment, CommentLike, User, comment_hot_score
+from app.routers.comments import toggle_like_portable, toggle_like_upsert
+from app.search import is_postgres
+
+EDITED_AT = datetime(2024, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture(params=[toggle_like_portable, toggle_like_upsert], ids=["portable", "upsert"])
+def toggle_like(request, db):
+    if request.param is toggle_like_upsert and not is_postgres(db):
+        pytest.skip("upsert toggle needs PostgreSQL (TEST_DATABASE_URL)")
+    return request.param
+
+
+def make_user(db, name: str) -> User:
+    user = User(username=name, email=f"{name}@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    return user
+
+
+@pytest.fixture
+def post(db):
+    post = BlogPost(slug="counters", author_id=make_user(db, "author").id)
+    db.add(post)
+    db.flush()
+    return post
+
+
+def add_comment(db, post: BlogPost, parent: Comment = None) -> Comment:
+    comment = Comment(
+        post_id=post.id, user_id=post.author_id, parent_id=parent.id if parent else None,
+        content="text", updated_at=EDITED_AT
+    )
+    db.add(comment)
+    db.flush()
+    return comment
+
+
+def stored_counters(db, comment_id: int) -> tuple:
+    db.expire_all()
+    return db.query(
+        Comment.likes_count, Comment.dislikes_count, Comment.score
+    ).filter(Comment.id == comment_id).one()
+
+
+def assert_consistent(db, comment_id: int) -> None:
+    """Counters match the vote rows, hot_score follows score, updated_at is untouched"""
+    db.expire_all()
+    comment = db.get(Comment, comment_id)
+    votes = db.query(CommentLike.is_like).filter(CommentLike.comment_id == comment_id).all()
+    likes = sum(1 for (is_like,) in votes if is_like)
+    assert (comment.likes_count, comment.dislikes_count) == (likes, len(votes) - likes)
+    assert comment.score == comment.likes_count - comment.dislikes_count
+    assert comment.hot_score == pytest.approx(comment_hot_score(comment.score, comment.created_at))
+    assert comment.updated_at == EDITED_AT
+
+
+def test_like_dislike_remove_transitions(db, post, toggle_like):
+    comment = add_comment(db, post)
+    voter = make_user(db, "voter")
+    db.commit()
+
+    steps = [
+        (True, "added", 1, 0, 1),
+        (False, "updated", 0, 1, -1),
+        (False, "removed", 0, 0, 0),
+        (False, "added", 0, 1, -1),
+        (True, "updated", 1, 0, 1),
+        (True, "removed", 0, 0, 0),
+    ]
+    for is_like, action, likes, dislikes, score in steps:
+        assert toggle_like(db, comment.id, voter.id, is_like) == (action, likes, dislikes, score)
+        db.commit()
+        assert stored_counters(db, comment.id) == (likes, dislikes, score)
+        assert_consistent(db, comment.id)
+
+
+def test_votes_of_several_users(db, post, toggle_like):
+    comment = add_comment(db, post)
+    voters = [make_user(db, f"voter{i}") for i in range(4)]
+    db.commit()
+
+    for voter, is_like in zip(voters, [True, True, True, False]):
+        toggle_like(db, comment.id, voter.id, is_like)
+        db.commit()
+    assert stored_counters(db, comment.id) == (3, 1, 2)
+
+    toggle_like(db, comment.id, voters[0].id, False)  # like -> dislike
+    toggle_like(db, comment.id, voters[3].id, False)  # dislike removed
+    db.commit()
+    assert stored_counters(db, comment.id) == (2, 1, 1)
+    assert_consistent(db, comment.id)
+
+
+def test_votes_do_not_touch_other_comments(db, post, toggle_like):
+    comment, other = add_comment(db, post), add_comment(db, post)
+    voter = make_user(db, "voter")
+    db.commit()
+
+    toggle_like(db, comment.id, voter.id, True)
+    db.commit()
+    assert stored_counters(db, other.id) == (0, 0, 0)
+    assert_consistent(db, other.id)
+
+
+def stored_stats(db, post_id: int):
+    db.expire_all()
+    return db.query(
+        BlogPostCommentStats.comment_count, BlogPostCommentStats.reply_count
+    ).filter(BlogPostCommentStats.post_id == post_id).one_or_none()
+
+
+def test_post_stats_row_created_from_full_count(db, post):
+    # Comments written before the stats row existed
+    first = add_comment(db, post)
+    add_comment(db, post, parent=first)
+    db.commit()
+    assert stored_stats(db, post.id) is None
+
+    add_comment(db, post)
+    adjust_post_comment_stats(db, post.id, 1)
+    db.commit()
+    assert stored_stats(db, post.id) == (3, 1) == count_post_comments(db, post.id)
+
+
+def test_post_stats_deltas(db, post):
+    comment = add_comment(db, post)
+    adjust_post_comment_stats(db, post.id, 1)
+    db.commit()
+    assert stored_stats(db, post.id) == (1, 0)
+
+    reply = add_comment(db, post, parent=comment)
+    adjust_post_comment_stats(db, post.id, 1, 1)
+    db.commit()
+    assert stored_stats(db, post.id) == (2, 1)
+
+    reply.is_deleted = True
+    adjust_post_comment_stats(db, post.id, -1, -1)
+    db.commit()
+    assert stored_stats(db, post.id) == (1, 0) == count_post_comments(db, post.id)
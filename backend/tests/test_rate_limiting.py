@@ -0,0 +1,143 @@
+"""Shared rate-limit storage, the local fast path and its wiring into slowapi"""
+import asyncio
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from limits import RateLimitItemPerMinute
+from limits.strategies import FixedWindowRateLimiter
+from slowapi.util import get_remote_address
+
+from app import rate_limiting
+from app.rate_limiting import LocalFastPathRateLimiter, SharedLimiter, SqliteStorage
+
+
+@pytest.fixture
+def storage_uri(tmp_path):
+    return f"sqlite:///{tmp_path}/rate_limits.db"
+
+
+def fast_path(storage_uri: str, sync_interval: float = 60) -> LocalFastPathRateLimiter:
+    """Limiter of one worker - its own connection to the shared file"""
+    return LocalFastPathRateLimiter(SqliteStorage(storage_uri), local_min=100, sync_interval=sync_interval)
+
+
+def shared_count(limiter: LocalFastPathRateLimiter, item, *identifiers) -> int:
+    return limiter.storage.get(item.key_for(*identifiers))
+
+
+def test_sqlite_storage_counts_across_connections(storage_uri):
+    first, second = SqliteStorage(storage_uri), SqliteStorage(storage_uri)
+    assert first.incr("key", 60) == 1
+    assert second.incr("key", 60, amount=2) == 3
+    assert first.get("key") == 3
+
+
+def test_sqlite_storage_restarts_expired_window(storage_uri):
+    storage = SqliteStorage(storage_uri)
+    storage.incr("key", 0, amount=5)
+    assert storage.get("key") == 0
+    assert storage.incr("key", 60) == 1
+
+
+def test_two_workers_admit_exactly_a_strict_limit(storage_uri):
+    workers = [fast_path(storage_uri), fast_path(storage_uri)]
+    item = RateLimitItemPerMinute(5)
+    admitted = sum(workers[i % 2].hit(item, "client") for i in range(20))
+    assert admitted == 5
+
+
+def test_strict_limits_bypass_the_fast_path(storage_uri):
+    limiter = fast_path(storage_uri)
+    item = RateLimitItemPerMinute(5)
+    for hits in range(1, 4):
+        limiter.hit(item, "client")
+        assert shared_count(limiter, item, "client") == hits
+    assert not limiter._local
+
+
+def test_two_workers_never_exceed_a_generous_limit(storage_uri):
+    workers = [fast_path(storage_uri), fast_path(storage_uri)]
+    item = RateLimitItemPerMinute(100)
+    admitted = sum(workers[i % 2].hit(item, "client") for i in range(300))
+    assert 90 <= admitted <= 100
+
+    for worker in workers:
+        worker.flush()
+    assert shared_count(workers[0], item, "client") == 300
+
+
+def test_fast_path_batches_hits_until_flush(storage_uri):
+    limiter = fast_path(storage_uri)
+    item = RateLimitItemPerMinute(200)
+    for _ in range(10):
+        assert limiter.hit(item, "client")
+    assert shared_count(limiter, item, "client") == 1  # First hit syncs, the rest are local
+
+    assert limiter.flush() == 1
+    assert shared_count(limiter, item, "client") == 10
+    assert limiter.flush() == 0
+
+
+def test_eviction_pushes_pending_hits(storage_uri, monkeypatch):
+    monkeypatch.setattr(rate_limiting, "RATE_LIMIT_LOCAL_KEYS", 2)
+    limiter = fast_path(storage_uri)
+    item = RateLimitItemPerMinute(200)
+    for _ in range(3):
+        limiter.hit(item, "evicted")
+    assert shared_count(limiter, item, "evicted") == 1
+
+    limiter.hit(item, "second")
+    limiter.hit(item, "third")
+    assert item.key_for("evicted") not in limiter._local
+    assert shared_count(limiter, item, "evicted") == 3
+
+
+def test_shared_limiter_keeps_the_fast_path_after_slowapi_rebuilds_the_strategy(storage_uri):
+    limiter = SharedLimiter(get_remote_address, storage_uri, fast_path=True)
+    assert isinstance(limiter.limiter, LocalFastPathRateLimiter)
+    assert limiter.limiter.storage is limiter._storage
+
+    # What slowapi does in init_app and when a failed storage comes back
+    limiter._limiter = FixedWindowRateLimiter(limiter._storage)
+    assert isinstance(limiter.limiter, LocalFastPathRateLimiter)
+
+
+def test_slowapi_requests_go_through_the_fast_path(storage_uri):
+    limiter = SharedLimiter(get_remote_address, storage_uri, fast_path=True)
+    app = FastAPI()
+    app.state.limiter = limiter
+
+    @app.get("/generous")
+    @limiter.limit("200/minute")
+    def generous(request: Request):
+        return {}
+
+    @app.get("/strict")
+    @limiter.limit("2/minute")
+    def strict(request: Request):
+        return {}
+
+    client = TestClient(app)
+    assert all(client.get("/generous").status_code == 200 for _ in range(10))
+    assert limiter.flush_local_hits() == 1
+    assert [client.get("/strict").status_code for _ in range(3)] == [200, 200, 429]
+
+
+def test_periodic_flush_pushes_local_hits(storage_uri, monkeypatch):
+    from app import main
+
+    limiter = SharedLimiter(get_remote_address, storage_uri, fast_path=True)
+    monkeypatch.setattr(main, "limiter", limiter)
+    monkeypatch.setattr(main, "RATE_LIMIT_SYNC_INTERVAL", 0.01)
+    item = RateLimitItemPerMinute(200)
+    for _ in range(5):
+        limiter.limiter.hit(item, "client")
+
+    async def run_timer():
+        task = asyncio.create_task(main.periodic_rate_limit_flush())
+        await asyncio.sleep(0.2)
+        task.cancel()
+
+    asyncio.run(run_timer())
+    assert limiter._storage.get(item.key_for("client")) == 5